@@ -1,5 +1,17 @@
+import argparse
+
 from src.Simulator import Simulator
 
 if __name__ == "__main__":
-    simulator = Simulator('Fuzzy Traffic System')
+    parser = argparse.ArgumentParser(description='Fuzzy Traffic Control Simulator')
+    parser.add_argument('--multiprocess', action='store_true',
+                        help='run the simulation in a worker process and only draw in this one')
+    parser.add_argument('--record', metavar='DIR',
+                        help='save a recording of the run for offline rendering with src.Recording')
+    parser.add_argument('--telemetry-ring', metavar='FILE',
+                        help='publish live telemetry to a memory-mapped ring file, read with src.TelemetryRing')
+    args = parser.parse_args()
+
+    simulator = Simulator('Fuzzy Traffic System', multiprocess=args.multiprocess, record_path=args.record,
+                          ring_path=args.telemetry_ring)
     simulator.start()
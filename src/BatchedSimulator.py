@@ -0,0 +1,334 @@
+import argparse
+import time
+import numpy as np
+
+from src.Common import Lane, TrafficStatus
+from src.Config import Config
+from src.Fuzzy import Fuzzy
+from src.Kinematics import IntelligentDriverModel
+from src.LaneGeometry import build_lane_geometry
+
+GREEN = TrafficStatus.green.value
+YELLOW = TrafficStatus.yellow.value
+RED = TrafficStatus.red.value
+
+# Lane index (Lane.value - 1) of the light each light waits for, as TrafficController.get_opposite_status
+OPPOSITE = [Lane.bottom_to_top.value - 1] * 2 + [Lane.left_to_right.value - 1] * 2
+# Spawn rate column (0 horizontal, 1 vertical) of each lane
+DOUBLE_LANE = np.array([0, 0, 1, 1])
+
+L2R, R2L, B2T, T2B = (lane.value - 1 for lane in [
+    Lane.left_to_right, Lane.right_to_left, Lane.bottom_to_top, Lane.top_to_bottom
+])
+NO_ACTIVE_LANE, HORIZONTAL, VERTICAL = 0, 1, 2
+
+
+class BatchedSimulator:
+    """
+    B independent copies of the junction stepped together.
+
+    Every piece of state carries the environment as its leading dimension:
+    vehicle positions are (B, lane, slot) progress values, kept front vehicle
+    first, and light phases and timers are (B, lane). One step() advances
+    every environment with the same rules as Simulator.step() in 'phase_end'
+    or 'fixed' control mode, and all fuzzy decisions due on that tick are
+    taken in one batched inference. All environments share one simulated clock.
+    """
+
+    def __init__(self, num_envs, spawn_rates=None, control=None, seed=0):
+        """
+        :param num_envs: Number of environments B
+        :param spawn_rates: (horizontal, vertical) spawn rate names per environment, 'slow' for all by default;
+        only used with the 'intervals' demand model
+        :param control: Control mode, 'phase_end' or 'fixed', for all environments or one per environment;
+        defaults to Config
+        :param seed: Seed of the arrival streams of the 'poisson' demand model
+        """
+        cfg = Config['simulator']
+        self.num_envs = num_envs
+        self.frame_rate = cfg['frame_rate']
+        self.tick_seconds = 1 / self.frame_rate
+        self.time = 0.0
+        self.start_time = self.time
+        self.ticks = 0
+
+        control = cfg['control_mode'] if control is None else control
+        control = [control] * num_envs if isinstance(control, str) else list(control)
+        if any(mode not in ('phase_end', 'fixed') for mode in control):
+            raise ValueError("Batched environments support the 'phase_end' and 'fixed' control modes")
+        self.fuzzy_enabled = np.array([mode == 'phase_end' for mode in control])
+        self.fuzzy = Fuzzy()
+
+        # Per-lane constants, shaped to broadcast against (B, lane, slot)
+        geometry = build_lane_geometry()
+        world = {'x': Config['world']['width'], 'y': Config['world']['height']}
+        lanes = [geometry[lane] for lane in Lane]
+        self.vehicle_length = np.array([g.vehicle_length for g in lanes], dtype=np.float64)
+        self.spawn_progress = np.array([g.spawn_progress for g in lanes], dtype=np.float64)
+        self.stop_progress = np.array([g.stop_progress for g in lanes], dtype=np.float64)
+        self.hold_progress = np.array([g.hold_progress for g in lanes], dtype=np.float64)
+        # Largest progress still inside the world, as Vehicle.inside_canvas
+        self.exit_progress = np.array([
+            world[g.axis] - g.vehicle_length if g.sign > 0 else 0 for g in lanes
+        ], dtype=np.float64)
+
+        vehicle = Config['vehicle']
+        self.speed = vehicle['speed']
+        self.spawn_gap = vehicle['safe_distance'] * vehicle['safe_spawn_factor']
+        # Vehicle i of a lane can be at most i * gap behind the front one
+        gap = vehicle['safe_distance'] + self.vehicle_length
+        self.num_slots = int(max(world.values()) // gap.min()) + 2
+        self.slot = np.arange(self.num_slots)
+        self.slot_offset = gap[:, None] * self.slot
+
+        shape = (num_envs, len(Lane))
+        self.progress = np.zeros(shape + (self.num_slots,), dtype=np.float64)
+        self.count = np.zeros(shape, dtype=np.int64)
+        # IDM car following, as VehicleController.kinematics, with per-vehicle speeds in pixels per second
+        self.kinematics = IntelligentDriverModel() if vehicle['kinematics'] == 'idm' else None
+        self.velocity = np.zeros_like(self.progress)
+
+        # Lights: horizontal lanes start green, vertical ones red, as TrafficController
+        light = Config['traffic_light']
+        self.duration = np.zeros(max(s.value for s in TrafficStatus) + 1)
+        self.duration[GREEN] = light['green_light_duration']
+        self.duration[YELLOW] = light['yellow_light_duration']
+        self.duration[RED] = light['red_light_duration']
+        self.gap_between_switch = cfg['gap_between_traffic_switch']
+        self.status = np.full(shape, GREEN, dtype=np.int64)
+        self.status[:, [B2T, T2B]] = RED
+        self.phase_start = np.full(shape, self.time)
+        self.extension = np.zeros(shape)  # green light extension, seconds
+
+        # Fuzzy inputs: queue counts over a moving window, refreshed every static_duration
+        window = self.frame_rate * cfg['moving_averages_period']
+        self.queue_window = np.zeros(shape + (window,), dtype=np.int64)
+        self.queue_sum = np.zeros(shape, dtype=np.int64)
+        self.moving_averages = np.zeros(shape)
+        self.is_extended = np.zeros(num_envs, dtype=bool)
+        self.extended_green_start_time = np.full(num_envs, np.nan)
+
+        # Demand
+        self.demand = Config['demand']['arrivals']
+        if self.demand == 'intervals':
+            spawn_rates = [('slow', 'slow')] * num_envs if spawn_rates is None else spawn_rates
+            self.spawn_interval = np.array([
+                [cfg['spawn_rate'][rate] / 1000 for rate in rates] for rates in spawn_rates
+            ], dtype=np.float64)
+            self.next_spawn_time = np.zeros((num_envs, 2))
+        elif self.demand == 'poisson':
+            self.rng = np.random.default_rng(seed)
+            flow = Config['demand']['flow']
+            self.mean_headway = np.array([3600 / flow[lane.name] for lane in Lane], dtype=np.float64)
+            self.next_arrival = np.full(shape, np.inf)
+        else:
+            raise ValueError("Batched environments support the 'intervals' and 'poisson' demand models")
+
+        self.counter = np.zeros(num_envs, dtype=np.int64)
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        """Start measuring from now on, e.g. after a warmup."""
+        self.metric_ticks = 0
+        self.served = np.zeros((self.num_envs, len(Lane)), dtype=np.int64)
+        self.queue_total = np.zeros((self.num_envs, len(Lane)), dtype=np.int64)
+        self.spawned_start = self.counter.copy()
+
+    def initialize(self):
+        """Initial vehicles and spawn times, as Simulator.initialize."""
+        if self.demand == 'poisson':
+            self.next_arrival = self.time + self.rng.exponential(self.mean_headway, size=self.count.shape)
+            return
+        self._spawn(np.ones(self.count.shape, dtype=bool))
+        self.next_spawn_time[:] = self.time + Config['simulator']['spawn_rate']['slow'] / 1000
+
+    def _active(self):
+        """Mask of the occupied (B, lane, slot) positions."""
+        return self.slot < self.count[..., None]
+
+    def _spawn(self, wanted):
+        """Add a vehicle at the back of every wanted (B, lane) with room at the entry; returns the spawned mask."""
+        last = np.take_along_axis(self.progress, np.maximum(self.count - 1, 0)[..., None], axis=2)[..., 0]
+        room = (self.count == 0) | (last - self.spawn_gap >= self.spawn_progress + self.vehicle_length)
+        spawned = wanted & room & (self.count < self.num_slots)
+        envs, lanes = spawned.nonzero()
+        slots = self.count[envs, lanes]
+        self.progress[envs, lanes, slots] = self.spawn_progress[lanes]
+        if self.kinematics is not None:
+            behind = slots > 0
+            previous = np.maximum(slots - 1, 0)
+            self.velocity[envs, lanes, slots] = np.where(behind, self.kinematics.entry_speed(
+                last[envs, lanes] - self.spawn_progress[lanes] - self.vehicle_length[lanes],
+                self.velocity[envs, lanes, previous]
+            ), self.kinematics.desired_speed)
+        self.count += spawned
+        self.counter += spawned.sum(axis=1)
+        return spawned
+
+    def update_spawns(self):
+        if self.demand == 'poisson':
+            # At most one arrival per lane and tick; blocked arrivals wait at the entry
+            spawned = self._spawn(self.time >= self.next_arrival)
+            envs, lanes = spawned.nonzero()
+            self.next_arrival[envs, lanes] += self.rng.exponential(self.mean_headway[lanes])
+            return
+        due = self.time >= self.next_spawn_time
+        self.next_spawn_time = np.where(due, self.time + self.spawn_interval, self.next_spawn_time)
+        self._spawn(due[:, DOUBLE_LANE])
+
+    def update_traffic_lights(self):
+        """TrafficLight.auto_update for every light, lane by lane in the order the TrafficController uses."""
+        now = self.time
+        for i in range(len(Lane)):
+            status = self.status[:, i]
+            total_duration = self.duration[status] + np.where(status == GREEN, self.extension[:, i], 0)
+            remaining = total_duration - (now - self.phase_start[:, i])
+            due = remaining <= 0
+
+            to_green = due & (status == RED) & (self.status[:, OPPOSITE[i]] != GREEN) & \
+                ~(np.abs(remaining) < self.gap_between_switch)
+            new_status = np.where(due & (status == GREEN), YELLOW, status)
+            new_status = np.where(due & (status == YELLOW), RED, new_status)
+            new_status = np.where(to_green, GREEN, new_status)
+
+            self.phase_start[:, i] = np.where(new_status != status, now, self.phase_start[:, i])
+            self.status[:, i] = new_status
+
+    def destroy_vehicles_outside_world(self):
+        """Drop the vehicles that drove out; only the front of a lane can leave it."""
+        left = (self._active() & (self.progress > self.exit_progress[:, None])).sum(axis=2)
+        if left.any():
+            source = np.minimum(self.slot + left[..., None], self.num_slots - 1)
+            self.progress = np.take_along_axis(self.progress, source, axis=2)
+            self.velocity = np.take_along_axis(self.velocity, source, axis=2)
+            self.count -= left
+            self.served += left
+
+    def update_vehicles(self):
+        """
+        Vehicle.move for every vehicle at once.
+        Each vehicle goes as far as its speed and a red light allow, but no closer
+        than one gap to the already moved vehicle ahead. That chain is a running
+        minimum along the slot axis once slot i is shifted by i gaps.
+        With IDM kinematics the whole array steps through the model instead.
+        """
+        active = self._active()
+        progress = self.progress
+        if self.kinematics is not None:
+            obstacle = np.where(self.status != GREEN, self.hold_progress, np.inf)[..., None]
+            moved, velocity, _ = self.kinematics.step(progress, self.velocity, self.vehicle_length[:, None], obstacle)
+            self.progress = np.where(active, moved, progress)
+            self.velocity = np.where(active, velocity, 0.0)
+            return
+        target = progress + self.speed
+        stopping = (self.status != GREEN)[..., None] & (progress <= self.stop_progress[:, None])
+        target = np.where(stopping, np.minimum(target, self.hold_progress[:, None]), target)
+        target = np.where(active, target + self.slot_offset, np.inf)
+        moved = np.minimum.accumulate(target, axis=2) - self.slot_offset
+        self.progress = np.where(active, moved, progress)
+
+    def update_num_vehicles_behind_traffic(self):
+        queue = (self._active() & (self.progress <= self.stop_progress[:, None])).sum(axis=2)
+        i = self.ticks % self.queue_window.shape[2]
+        self.queue_sum += queue - self.queue_window[..., i]
+        self.queue_window[..., i] = queue
+        self.queue_total += queue
+
+    def get_moving_averages(self):
+        return self.queue_sum / min(self.ticks + 1, self.queue_window.shape[2])
+
+    def get_current_active_lane(self):
+        """(B,) HORIZONTAL, VERTICAL or NO_ACTIVE_LANE, as TrafficController.get_current_active_lane."""
+        return np.where(self.status[:, L2R] == GREEN, HORIZONTAL,
+                        np.where(self.status[:, T2B] == GREEN, VERTICAL, NO_ACTIVE_LANE))
+
+    def update_controllers(self):
+        """Same order as Simulator.update_controllers."""
+        self.update_traffic_lights()
+        self.destroy_vehicles_outside_world()
+        self.update_vehicles()
+        self.update_num_vehicles_behind_traffic()
+
+        if round((self.time - self.start_time), 1) % Config['simulator']['static_duration'] == 0:
+            self.moving_averages = self.get_moving_averages()
+
+        active_lane = self.get_current_active_lane()
+        horizontal = active_lane == HORIZONTAL
+        # TrafficController reads the remaining time of one light and the start time of another
+        remaining_light = np.where(horizontal, L2R, B2T)
+        start_light = np.where(horizontal, L2R, T2B)
+        envs = np.arange(self.num_envs)
+        remaining = self.duration[GREEN] + self.extension[envs, remaining_light] - \
+            (self.time - self.phase_start[envs, remaining_light])
+        remaining = np.where(active_lane == NO_ACTIVE_LANE, 0, np.maximum(0.0, remaining))
+        green_start = np.where(active_lane == NO_ACTIVE_LANE, np.nan, self.phase_start[envs, start_light])
+
+        decide = self.fuzzy_enabled & ~self.is_extended & (active_lane != NO_ACTIVE_LANE) & \
+            (remaining <= Config['simulator']['seconds_before_extension'])
+        # The extended green is over; the next one gets its own decision
+        over = self.fuzzy_enabled & self.is_extended & ~(green_start == self.extended_green_start_time)
+
+        if decide.any():
+            envs = decide.nonzero()[0]
+            is_horizontal = horizontal[envs, None]
+            averages = self.moving_averages[envs]
+            arriving = np.where(is_horizontal, averages[:, [L2R]], averages[:, [T2B]])[:, 0]
+            behind = np.where(is_horizontal, averages[:, [T2B]], averages[:, [L2R]])[:, 0]
+            extension = self.fuzzy.get_extension_batch(arriving, behind, 0)
+            # Both lights of the active double lane get the extension
+            lanes = np.where(is_horizontal, DOUBLE_LANE == 0, DOUBLE_LANE == 1)
+            self.extension[envs] = np.where(lanes, extension[:, None], self.extension[envs])
+            self.extended_green_start_time[envs] = green_start[envs]
+            self.is_extended[envs] = True
+        if over.any():
+            self.extension[over] = 0
+            self.is_extended[over] = False
+
+    def step(self):
+        """Advance every environment by one frame."""
+        self.update_spawns()
+        self.update_controllers()
+        self.ticks += 1
+        self.metric_ticks += 1
+        self.time += self.tick_seconds
+
+    def run(self, seconds):
+        """Step every environment through `seconds` of simulated time."""
+        for _ in range(int(seconds * self.frame_rate)):
+            self.step()
+
+    def summary(self):
+        """Per-environment metrics since the last reset_metrics, as arrays of length B."""
+        seconds = max(self.metric_ticks, 1) / self.frame_rate
+        return {
+            'served_per_hour': self.served.sum(axis=1) * 3600 / seconds,
+            'mean_queue': self.queue_total.sum(axis=1) / max(self.metric_ticks, 1),
+            'spawned': self.counter - self.spawned_start
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Step many junctions at once and report simulation speed')
+    parser.add_argument('--envs', type=int, default=256)
+    parser.add_argument('--seconds', type=float, default=600, help='simulated seconds per environment')
+    parser.add_argument('--control', choices=['phase_end', 'fixed'], default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    # Spread the environments over every combination of spawn rates
+    rates = ['slow', 'medium', 'fast']
+    combinations = [(h, v) for h in rates for v in rates]
+    batch = BatchedSimulator(args.envs, [combinations[i % len(combinations)] for i in range(args.envs)],
+                             args.control, args.seed)
+    batch.initialize()
+    start = time.perf_counter()
+    batch.run(args.seconds)
+    elapsed = time.perf_counter() - start
+
+    summary = batch.summary()
+    print(f'{args.envs} environments x {args.seconds:.0f} s in {elapsed:.2f} s: '
+          f'{args.envs * args.seconds / 3600 / elapsed:.1f} junction-hours/s')
+    for i, (horizontal, vertical) in enumerate(combinations[:args.envs]):
+        envs = slice(i, None, len(combinations))
+        print(f'{horizontal + "-" + vertical:<16} served/h {summary["served_per_hour"][envs].mean():7.0f}  '
+              f'queue {summary["mean_queue"][envs].mean():6.2f}')
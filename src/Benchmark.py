@@ -0,0 +1,229 @@
+import argparse
+import copy
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+from src.Common import Lane, DoubleLane
+from src.Clock import clock
+from src.Config import Config
+from src.Snapshot import RATES, _apply_overrides
+
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+CHUNK_TICKS = 300
+REFERENCE_OPS = 200000
+
+# Fuzzy extensions on (one decision per green) and off (plain traffic light durations)
+CONTROLS = {
+    'fuzzy': 'phase_end',
+    'fixed': 'fixed'
+}
+
+
+def _scenarios():
+    """Scenario name -> (spawn rate per double lane or None, Config overrides)."""
+    scenarios = {}
+    for horizontal in RATES:
+        for vertical in RATES:
+            rates = {DoubleLane.Horizontal: horizontal, DoubleLane.Vertical: vertical}
+            scenarios[f'{horizontal}-{vertical}'] = (rates, {})
+
+    # Uneven demand within a double lane, which the spawn rate buttons cannot express
+    scenarios['one-way-peak'] = (None, {'demand': {
+        'arrivals': 'poisson',
+        'flow': {'left_to_right': 1800, 'right_to_left': 300, 'top_to_bottom': 600, 'bottom_to_top': 600}
+    }})
+    scenarios['platooned-major-road'] = (None, {'demand': {
+        'arrivals': 'platoon',
+        'flow': {'left_to_right': 900, 'right_to_left': 900, 'top_to_bottom': 300, 'bottom_to_top': 150}
+    }})
+    return scenarios
+
+
+SCENARIOS = _scenarios()
+
+
+def run_scenario(name, control, seconds, warmup=60, seed=0):
+    """
+    Run one scenario headless in simulated time and measure it.
+    Config is restored afterwards, so scenarios can run back to back.
+    :param control: Key of CONTROLS
+    :param seconds: Simulated seconds measured, after `warmup` seconds to fill the lanes
+    """
+    from src.Simulator import Simulator
+
+    saved = copy.deepcopy(Config)
+    try:
+        rates, overrides = SCENARIOS[name]
+        _apply_overrides(Config, overrides)
+        Config['simulator']['control_mode'] = CONTROLS[control]
+        frame_rate = Config['simulator']['frame_rate']
+
+        random.seed(seed)
+        clock.use_simulated()
+        simulator = Simulator(name, headless=True)
+        if rates is not None:
+            for double_lane, rate in rates.items():
+                simulator.background_ctrl.set_spawn_rate(double_lane, rate)
+        simulator.initialize()
+        for _ in range(int(warmup * frame_rate)):
+            simulator.step()
+
+        vehicle_ctrl = simulator.vehicle_ctrl
+        windows = [vehicle_ctrl.num_vehicles_behind_traffic[lane] for lane in Lane]
+        spawned_start = vehicle_ctrl.counter
+        present_start = sum(len(vehicle_ctrl.get_vehicles(lane)) for lane in Lane)
+        delay_start = _delay_totals(vehicle_ctrl.telemetry)
+
+        num_ticks = int(seconds * frame_rate)
+        queue_total = 0
+        # Speed is the median over chunks of simulated time, which shrugs off
+        # short interruptions from the rest of the machine
+        chunk_rates = []
+        for chunk_start in range(0, num_ticks, CHUNK_TICKS):
+            chunk = min(CHUNK_TICKS, num_ticks - chunk_start)
+            start = time.perf_counter()
+            for _ in range(chunk):
+                simulator.step()
+                # Queue counts were just taken by update_num_vehicles_behind_traffic
+                queue_total += sum(window[-1] for window in windows)
+            chunk_rates.append(chunk / (time.perf_counter() - start))
+        ticks_per_second = statistics.median(chunk_rates)
+
+        spawned = vehicle_ctrl.counter - spawned_start
+        served = spawned - (sum(len(vehicle_ctrl.get_vehicles(lane)) for lane in Lane) - present_start)
+        result = {
+            'served_per_hour': served * 3600 / seconds,
+            'mean_queue': queue_total / max(num_ticks, 1),
+            'ticks_per_second': ticks_per_second,
+            'realtime_factor': ticks_per_second / frame_rate
+        }
+        if vehicle_ctrl.telemetry is not None:
+            completed, delay = (end - begin for begin, end in zip(delay_start, _delay_totals(vehicle_ctrl.telemetry)))
+            result['mean_delay'] = delay / max(completed, 1)
+        return result
+    finally:
+        Config.clear()
+        Config.update(saved)
+
+
+def _delay_totals(telemetry):
+    if telemetry is None:
+        return 0, 0.0
+    return int(telemetry.completed.sum()), float(telemetry.delay_sum.sum())
+
+
+def reference_rate(repeats=5):
+    """
+    Speed of this machine right now on a fixed interpreter-bound kernel, in operations
+    per second (median of `repeats`). Simulation speed is reported relative to it, so
+    that runs from different hosts or loads can be compared.
+    """
+    rates = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        values = {}
+        for i in range(REFERENCE_OPS):
+            values[i % 97] = values.get(i % 97, 0.0) * 0.5 + i
+        rates.append(REFERENCE_OPS / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def run_benchmark(scenarios=None, controls=None, seconds=600, warmup=60, seed=0):
+    """Run every scenario under every control: {scenario: {control: metrics}}."""
+    scenarios = list(SCENARIOS) if scenarios is None else scenarios
+    controls = list(CONTROLS) if controls is None else controls
+    results = {}
+    for name in scenarios:
+        results[name] = {}
+        for control in controls:
+            metrics = run_scenario(name, control, seconds, warmup, seed)
+            # Measured right after the run, under the same conditions
+            metrics['relative_speed'] = metrics['ticks_per_second'] / reference_rate()
+            results[name][control] = metrics
+    return {
+        'settings': {'seconds': float(seconds), 'warmup': float(warmup), 'seed': seed},
+        'results': results
+    }
+
+
+def compare(report, baseline, tolerance=0.05):
+    """
+    Print the report next to a baseline and list the regressions.
+    Only the control metrics, deterministic for a given seed, can regress. Simulation
+    speed is printed for information, as the change in ticks per reference kernel
+    operation, since even that moves by tens of percent between runs on a busy host.
+    :return: List of (scenario, control, metric) that got worse beyond tolerance
+    """
+    regressions = []
+    base_results = baseline['results'] if baseline is not None else {}
+    print(f"{'scenario':<22}{'control':<8}{'served/h':>10}{'queue':>8}{'delay s':>9}{'ticks/s':>10}  vs baseline")
+    for name, controls in report['results'].items():
+        for control, metrics in controls.items():
+            base = base_results.get(name, {}).get(control)
+            notes = []
+            if base is not None:
+                served_change = metrics['served_per_hour'] / max(base['served_per_hour'], 1e-9) - 1
+                queue_change = metrics['mean_queue'] / max(base['mean_queue'], 1e-9) - 1
+                notes.append(f'served {served_change:+.1%} queue {queue_change:+.1%}')
+                if 'relative_speed' in base:
+                    speed_change = metrics['relative_speed'] / base['relative_speed'] - 1
+                    notes.append(f'(speed {speed_change:+.1%})')
+                if served_change < -tolerance:
+                    regressions.append((name, control, 'served_per_hour'))
+                if queue_change > tolerance:
+                    regressions.append((name, control, 'mean_queue'))
+            print(f"{name:<22}{control:<8}{metrics['served_per_hour']:>10.0f}{metrics['mean_queue']:>8.2f}"
+                  f"{metrics.get('mean_delay', float('nan')):>9.2f}{metrics['ticks_per_second']:>10.0f}  "
+                  + ' '.join(notes))
+
+    for name, controls in report['results'].items():
+        if 'fuzzy' in controls and 'fixed' in controls:
+            gain = controls['fuzzy']['served_per_hour'] / max(controls['fixed']['served_per_hour'], 1e-9) - 1
+            print(f'{name:<22}fuzzy vs fixed throughput {gain:+.1%}')
+
+    for name, control, metric in regressions:
+        print(f'REGRESSION {name} {control}: {metric}')
+    return regressions
+
+
+def save_report(report, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scenario benchmark of fuzzy vs fixed-time control')
+    parser.add_argument('--seconds', type=float, default=600, help='simulated seconds measured per run')
+    parser.add_argument('--warmup', type=float, default=60, help='simulated seconds before measuring')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=None)
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='allowed relative loss in served/queue')
+    parser.add_argument('--save', action='store_true', help='store this run as the new baseline')
+    args = parser.parse_args()
+
+    report = run_benchmark(args.scenarios, seconds=args.seconds, warmup=args.warmup, seed=args.seed)
+    baseline = load_report(args.baseline)
+    if baseline is not None and baseline['settings'] != report['settings']:
+        print('Baseline was recorded with different settings; comparison skipped')
+        baseline = None
+    regressions = compare(report, baseline, args.tolerance)
+    if args.save:
+        save_report(report, args.baseline)
+        print(f'Baseline saved to {args.baseline}')
+    elif regressions:
+        sys.exit(1)
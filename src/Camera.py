@@ -0,0 +1,102 @@
+import pygame
+
+from src.Config import Config
+
+
+class Camera:
+    """
+    Maps world coordinates onto the window, with pan and zoom.
+    Everything drawn in world space goes through blit() or rect(), which skip
+    anything outside the visible rectangle.
+    """
+
+    def __init__(self):
+        self.screen_width = Config['simulator']['screen_width']
+        self.screen_height = Config['simulator']['screen_height']
+        self.world_width = Config['world']['width']
+        self.world_height = Config['world']['height']
+
+        cfg = Config['camera']
+        self.min_zoom = cfg['min_zoom']
+        self.max_zoom = cfg['max_zoom']
+        self.pan_speed = cfg['pan_speed']
+
+        self.zoom = 1.0
+        self.center_x = self.world_width / 2
+        self.center_y = self.world_height / 2
+        self.scaled_images = {}  # id(image) -> (image, scaled image) at the current zoom
+
+    @property
+    def left(self):
+        return self.center_x - self.screen_width / 2 / self.zoom
+
+    @property
+    def top(self):
+        return self.center_y - self.screen_height / 2 / self.zoom
+
+    def visible_rect(self):
+        """World rectangle (left, top, width, height) currently on screen."""
+        return self.left, self.top, self.screen_width / self.zoom, self.screen_height / self.zoom
+
+    def is_visible(self, x, y, width, height):
+        left, top, view_width, view_height = self.visible_rect()
+        return x + width >= left and x <= left + view_width and y + height >= top and y <= top + view_height
+
+    def to_screen(self, x, y):
+        return (x - self.left) * self.zoom, (y - self.top) * self.zoom
+
+    def to_world(self, screen_x, screen_y):
+        return screen_x / self.zoom + self.left, screen_y / self.zoom + self.top
+
+    def _clamp(self):
+        self.center_x = min(max(self.center_x, 0), self.world_width)
+        self.center_y = min(max(self.center_y, 0), self.world_height)
+
+    def pan(self, dx, dy):
+        """Move the view by (dx, dy) screen pixels."""
+        self.center_x += dx / self.zoom
+        self.center_y += dy / self.zoom
+        self._clamp()
+
+    def zoom_at(self, factor, screen_pos):
+        """Zoom by factor, keeping the world point under screen_pos fixed."""
+        zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        if zoom == self.zoom:
+            return
+        world_x, world_y = self.to_world(*screen_pos)
+        self.zoom = zoom
+        self.center_x = world_x - (screen_pos[0] - self.screen_width / 2) / zoom
+        self.center_y = world_y - (screen_pos[1] - self.screen_height / 2) / zoom
+        self._clamp()
+        self.scaled_images = {}
+
+    def handle_keys(self, keys):
+        """Pan with the arrow keys; keys is the result of pygame.key.get_pressed()."""
+        dx = keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
+        dy = keys[pygame.K_DOWN] - keys[pygame.K_UP]
+        if dx or dy:
+            self.pan(dx * self.pan_speed, dy * self.pan_speed)
+
+    def _scaled(self, image):
+        if self.zoom == 1:
+            return image
+        cached = self.scaled_images.get(id(image))
+        if cached is None or cached[0] is not image:
+            width, height = image.get_size()
+            size = (max(1, round(width * self.zoom)), max(1, round(height * self.zoom)))
+            cached = (image, pygame.transform.scale(image, size))
+            self.scaled_images[id(image)] = cached
+        return cached[1]
+
+    def blit(self, surface, image, x, y):
+        """Draw an image at world position (x, y) if any of it is visible."""
+        width, height = image.get_size()
+        if self.is_visible(x, y, width, height):
+            surface.blit(self._scaled(image), self.to_screen(x, y))
+
+    def rect(self, surface, color, rect):
+        """Draw a filled world rectangle (x, y, width, height) if any of it is visible."""
+        x, y, width, height = rect
+        if self.is_visible(x, y, width, height):
+            screen_x, screen_y = self.to_screen(x, y)
+            pygame.draw.rect(surface, color, (screen_x, screen_y, width * self.zoom, height * self.zoom))
@@ -0,0 +1,33 @@
+import time
+
+from src.Config import Config
+
+
+class SimulationClock:
+    """
+    Source of simulation time.
+    Follows the wall clock by default, so the window runs in real time; once
+    switched to simulated time it only moves when the simulator advances it by
+    one frame, which lets headless runs go as fast as the CPU allows.
+    """
+
+    def __init__(self):
+        self.simulated = False
+        self.time = 0.0
+        self.tick_seconds = 1 / Config['simulator']['frame_rate']
+
+    def now(self):
+        return self.time if self.simulated else time.time()
+
+    def use_simulated(self, start=0.0):
+        """Switch to simulated time starting at `start` seconds."""
+        self.simulated = True
+        self.time = start
+
+    def advance(self):
+        """Move simulated time forward by one frame; no-op on the wall clock."""
+        if self.simulated:
+            self.time += self.tick_seconds
+
+
+clock = SimulationClock()
@@ -3,20 +3,20 @@ from enum import Enum
 
 class Lane(Enum):
     """Represents the direction of a traffic lane."""
-    LEFT_TO_RIGHT = 1
-    RIGHT_TO_LEFT = 2
-    BOTTOM_TO_TOP = 3
-    TOP_TO_BOTTOM = 4
+    left_to_right = 1
+    right_to_left = 2
+    bottom_to_top = 3
+    top_to_bottom = 4
 
 
 class TrafficStatus(Enum):
     """Represents the traffic light state."""
-    RED = 1
-    GREEN = 2
-    YELLOW = 3
+    red = 1
+    green = 2
+    yellow = 3
 
 
 class DoubleLane(Enum):
     """Represents pairings of opposing lanes."""
-    HORIZONTAL = 1
-    VERTICAL = 2
+    Horizontal = 1
+    Vertical = 2
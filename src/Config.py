@@ -9,7 +9,20 @@ Config = {
         'safe_distance': 5,
         'body_length': 30,
         'body_width': 20,
-        'safe_spawn_factor': 1.1
+        'safe_spawn_factor': 1.1,
+        # 'constant': fixed speed per frame, a vehicle is stopped when it did not move;
+        # 'idm': Intelligent Driver Model, vehicles creep, so one is stopped below idm.stopped_speed
+        'kinematics': 'constant',
+        'idm': {                          # pixels and seconds; a 30 px vehicle is about 4.5 m
+            'desired_speed': 100,         # about 15 m/s
+            'max_acceleration': 10,       # about 1.5 m/s^2
+            'comfortable_deceleration': 13,
+            'max_deceleration': 40,       # harder braking than this runs a yellow light instead
+            'time_headway': 1.5,          # seconds
+            'minimum_gap': 10,            # standstill gap to the vehicle ahead
+            'exponent': 4,
+            'stopped_speed': 5            # about 0.75 m/s; telemetry counts slower vehicles as stopped
+        }
     },
 
     # Simulator environment settings
@@ -27,7 +40,10 @@ Config = {
         'moving_averages_period': 1,          # in seconds for statistics smoothing
         'static_duration': 1,                 # minimum duration before next change
         'seconds_before_extension': 1,        # delay before applying fuzzy extension
-        'fuzzy_notification_duration': 5      # time to display fuzzy extension notification
+        'fuzzy_notification_duration': 5,     # time to display fuzzy extension notification
+        'control_mode': 'phase_end',          # 'phase_end': one fuzzy decision per green, 'continuous': re-evaluate,
+                                              # 'fixed': no fuzzy extension
+        'max_shared_vehicles': 512            # vehicle slots per frame published to shared memory
     },
 
     # Color palette used across UI and simulation
@@ -45,6 +61,93 @@ Config = {
         'blue': (0, 0, 255)  # added for fuzzy button outline
     },
 
+    # World geometry, independent of the window; the junction sits at its center
+    'world': {
+        'width': 800,
+        'height': 800
+    },
+
+    # Camera over the world
+    'camera': {
+        'min_zoom': 0.1,
+        'max_zoom': 4,
+        'zoom_step': 1.1,       # zoom factor per mouse wheel notch
+        'pan_speed': 15         # screen pixels per frame while an arrow key is held
+    },
+
+    # Per-vehicle lifecycle telemetry (delay, stops, travel time)
+    'telemetry': {
+        'enabled': True,
+        'initial_capacity': 1024,         # vehicle slots preallocated, doubled when exhausted
+        'delay_histogram_bins': 600,
+        'delay_histogram_max': 300        # seconds; longer delays share the last bin
+    },
+
+    # Telemetry ring buffer file for external dashboards (main.py --telemetry-ring)
+    'dashboard': {
+        'capacity': 4096                  # records kept, one per tick
+    },
+
+    # Opt-in histograms of fuzzy inputs, rule strengths and outputs (src.FuzzyInstrumentation)
+    'fuzzy_instrumentation': {
+        'enabled': False,
+        'bins': 20,                       # bins per histogram axis
+        'export_path': None               # .npz written when the simulator exits
+    },
+
+    # Virtual loop detectors upstream of each stop line (src.Detectors)
+    'detectors': {
+        'enabled': False,
+        'distances': [0, 100, 250],       # detector positions, in pixels upstream of the stop line
+        'length': 12,                     # detection zone length along the lane, in pixels
+        'interval': 1,                    # seconds per count / occupancy sample
+        'history': 3600,                  # samples kept per detector
+        'fuzzy_inputs': False             # feed the detectors' queue estimates to the fuzzy controller
+    },
+
+    # Continuous control mode: fuzzy extension re-evaluated during the green phase
+    'continuous_control': {
+        'evaluation_interval': 3,         # minimum ticks between evaluations
+        'hysteresis': 1.0,                # seconds the extension must move before it is applied
+        'max_green_duration': 18,         # cap on green plus extension, in seconds
+        'frame_budget_fraction': 0.05,    # share of each frame evaluations may use on average
+        'lookup_step': 0.5                # fuzzy lookup table grid spacing, in vehicles
+    },
+
+    # Phase-end fuzzy decisions taken ahead of time off the frame (src.DecisionPipeline)
+    'decision_pipeline': {
+        'enabled': False,
+        'executor': 'thread',             # 'thread' or 'process'
+        'lead_time': 1.0,                 # simulated seconds before the decision is due to submit it
+        'wait': 0.0,                      # wall seconds to block at the deadline for a late result
+        'latency_bins': 30                # log-spaced latency histogram bins, 10 us to 10 s
+    },
+
+    # Long-run memory soak test (python -m src.Soak)
+    'soak': {
+        'duration': 86400,                # simulated seconds after the warmup
+        'warmup': 300,                    # simulated seconds before the baseline sample
+        'sample_interval': 600,           # simulated seconds between samples
+        'memory_budget_mb': 32,           # allowed RSS or traced growth over the baseline
+        'top_allocations': 15,            # allocation sites listed in the report
+        'traceback_frames': 1             # frames kept per tracemalloc trace
+    },
+
+    # Vehicle demand; 'intervals' keeps the fixed spawn intervals chosen with the spawn rate buttons
+    'demand': {
+        'arrivals': 'intervals',          # 'intervals', 'poisson' or 'platoon'
+        'horizon': 600,                   # seconds of arrivals generated at a time
+        'flow': {                         # vehicles per hour, per lane
+            'left_to_right': 600,
+            'right_to_left': 600,
+            'top_to_bottom': 400,
+            'bottom_to_top': 400
+        },
+        'platoon_size': 4,                # mean vehicles per platoon
+        'platoon_headway': 1.5,           # seconds between vehicles of a platoon
+        'profile': None                   # [(seconds, flow multiplier), ...] repeating, e.g. peak/off-peak
+    },
+
     # Traffic light timing and layout
     'traffic_light': {
         'red_light_duration': 10,         # in seconds
@@ -1,7 +1,18 @@
+import math
 import pygame
-import os
 from src.Common import DoubleLane, Lane
 from src.Config import Config
+from src.Sprites import sprites, background_key, get_font
+
+# Buildings, roads and pool as offsets of their top left corner from the junction center
+SCENERY = [
+    ('b4.jpg', (-392, -175)), ('b4.jpg', (-232, -175)), ('b3.jpg', (60, -175)), ('b3.jpg', (220, -175)),
+    ('b1.jpg', (350, 70)), ('b1.jpg', (270, 70)), ('b1.jpg', (120, 70)),
+    ('b4.jpg', (-392, 70)), ('b4.jpg', (-392, 150)), ('b4.jpg', (-392, 310)),
+    ('b4.jpg', (-221, 70)), ('b4.jpg', (-221, 150)), ('b4.jpg', (-221, 310)),
+    ('road1.png', (-22, -400)), ('road1.png', (-22, 50)), ('road3.png', (-400, -20)), ('road3.png', (50, -20)),
+    ('pool.png', (0, -400))
+]
 
 
 class BackgroundController:
@@ -11,6 +22,23 @@ class BackgroundController:
 
         self.screen_height = Config['simulator']['screen_height']
         self.screen_width = Config['simulator']['screen_width']
+        self.world_height = Config['world']['height']
+        self.world_width = Config['world']['width']
+
+        # Markings and scenery follow the lanes the vehicles drive on
+        geometry = {light.lane: light.geometry for light in traffic_lights}
+        mark_width = Config['background']['road_marking_width']
+        self.marking_lines = {'x': [], 'y': []}
+        for lane in Lane:
+            lane_geometry = geometry[lane]
+            self.marking_lines[lane_geometry.lateral_axis].append(
+                lane_geometry.lateral + lane_geometry.vehicle_breadth / 2 - mark_width / 2
+            )
+        # The junction is centered between the two lanes of each road
+        self.junction_center = tuple(
+            (geometry[a].lateral + geometry[b].lateral + geometry[b].vehicle_breadth) / 2
+            for a, b in [(Lane.top_to_bottom, Lane.bottom_to_top), (Lane.left_to_right, Lane.right_to_left)]
+        )
 
         colors = Config['colors']
         self.black = colors['black']
@@ -31,10 +59,8 @@ class BackgroundController:
         self.switch_traffic_button = None
         self.fuzzy_button = None
 
-    def _load_scaled_image(self, *rel_path_parts, size):
-        path = os.path.join(os.getcwd(), 'images', *rel_path_parts)
-        image = pygame.image.load(path)
-        return pygame.transform.scale(image, size)
+    def _sprite(self, name):
+        return sprites.get(background_key(name))
 
     def set_spawn_rate(self, double_lane: DoubleLane, target_rate):
         for rate in ['slow', 'medium', 'fast']:
@@ -50,9 +76,8 @@ class BackgroundController:
         self.surface.fill(self.black)
 
     def draw_spawn_rate_buttons(self):
-        normal_font = pygame.font.SysFont('Sans-serif', 25)
-        underline_font = pygame.font.SysFont('Sans-serif', 25)
-        underline_font.set_underline(True)
+        normal_font = get_font('Sans-serif', 25)
+        underline_font = get_font('Sans-serif', 25, underline=True)
 
         def draw_buttons(label, y_offset, lane):
             self.surface.blit(normal_font.render(label, True, self.white), (5, y_offset))
@@ -75,99 +100,95 @@ class BackgroundController:
         draw_buttons('Spawn Rate (Vertical):', 45, DoubleLane.Vertical)
 
     def draw_moving_averages(self, moving_averages):
-        font = pygame.font.SysFont('Sans-serif', 25)
+        font = get_font('Sans-serif', 25)
         self.surface.blit(font.render('Vehicles behind traffic (Horizontal):', True, self.white), (5, 65))
         self.surface.blit(font.render(f'{moving_averages[Lane.left_to_right]:.2f}', True, self.white), (320, 65))
         self.surface.blit(font.render('Vehicles behind traffic (Vertical):', True, self.white), (5, 85))
         self.surface.blit(font.render(f'{moving_averages[Lane.top_to_bottom]:.2f}', True, self.white), (320, 85))
 
     def draw_vehicle_count(self, total):
-        font = pygame.font.SysFont('Sans-serif', 25)
+        font = get_font('Sans-serif', 25)
         self.surface.blit(font.render(f'Total Vehicles: {total}', True, self.white), (5, 5))
 
-    def draw_road_markings(self):
+    def draw_road_markings(self, camera):
         cfg = Config['background']
-        bumper = Config['simulator']['bumper_distance']
-        body_width = Config['vehicle']['body_width']
         mark_width = cfg['road_marking_width']
         mark_len, mark_gap = cfg['road_marking_alternate_lengths']
         yb_top, yb_left, yb_bottom, yb_right = cfg['yellow_box_junction']
         gap = cfg['road_marking_gap_from_yellow_box']
-        color = Config['colors']['traffic_yelloww']
+        color = Config['colors']['lane_marker']
+        center_x, center_y = self.junction_center
 
         # yellow box junction
-        yellow_box = self._load_scaled_image('junction', 'yellow_box_junction.png', size=(yb_left + yb_right, yb_top + yb_bottom))
-        self.surface.blit(yellow_box, (self.screen_width / 2 - yb_left, self.screen_height / 2 - yb_top))
-
-        # buildings
-        for name, pos in [
-            ('b4.jpg', (8, 225)), ('b4.jpg', (168, 225)), ('b3.jpg', (460, 225)), ('b3.jpg', (620, 225)),
-            ('b1.jpg', (self.screen_width - yb_left, 470)), ('b1.jpg', (self.screen_width - yb_left - 80, 470)),
-            ('b1.jpg', (self.screen_width - yb_left - 230, 470)), ('b4.jpg', (8, 470)), ('b4.jpg', (8, 550)),
-            ('b4.jpg', (8, 710)), ('b4.jpg', (179, 470)), ('b4.jpg', (179, 550)), ('b4.jpg', (179, 710))
-        ]:
-            building = self._load_scaled_image('buildings', name, size=(yb_left + yb_right, yb_top + yb_bottom))
-            self.surface.blit(building, pos)
-
-        # roads and pool
-        for img, pos in [('road1.png', (378, 0)), ('road1.png', (378, 450)), ('road3.png', (0, 380)), ('road3.png', (450, 380)), ('pool.png', (400, 0))]:
-            asset = self._load_scaled_image('buildings', img, size=(yb_left + yb_right, yb_top + yb_bottom))
-            self.surface.blit(asset, pos)
-
-        # top-bottom markings
-        for x in [
-            self.screen_width / 2 - bumper - body_width / 2 - mark_width / 2,
-            self.screen_width / 2 + bumper + body_width / 2 - mark_width / 2
-        ]:
-            y = self.screen_height / 2 - yb_top - mark_len - mark_gap
-            while y >= 0:
-                pygame.draw.rect(self.surface, color, (x, y, mark_width, mark_len))
-                y -= mark_len + mark_gap
-            y = self.screen_height / 2 + yb_bottom + gap
-            while y <= self.screen_height:
-                pygame.draw.rect(self.surface, color, (x, y, mark_width, mark_len))
-                y += mark_len + mark_gap
-
-        # left-right markings
-        for y in [
-            self.screen_height / 2 - bumper - body_width / 2 - mark_width / 2,
-            self.screen_height / 2 + bumper + body_width / 2 - mark_width / 2
-        ]:
-            x = self.screen_width / 2 - yb_left - mark_len - gap
-            while x >= 0:
-                pygame.draw.rect(self.surface, color, (x, y, mark_len, mark_width))
-                x -= mark_len + mark_gap
-            x = self.screen_width / 2 + yb_right + gap
-            while x <= self.screen_width:
-                pygame.draw.rect(self.surface, color, (x, y, mark_len, mark_width))
-                x += mark_len + mark_gap
+        camera.blit(self.surface, self._sprite('yellow_box_junction.png'), center_x - yb_left, center_y - yb_top)
+
+        # buildings, roads and pool
+        for name, (dx, dy) in SCENERY:
+            camera.blit(self.surface, self._sprite(name), center_x + dx, center_y + dy)
+
+        left, top, view_width, view_height = camera.visible_rect()
+        step = mark_len + mark_gap
+
+        # top-bottom markings, down the middle of each vertical lane
+        for x in self.marking_lines['x']:
+            if not left - mark_width <= x <= left + view_width:
+                continue
+            for y in self._visible_dashes(center_y - yb_top - step, -step, 0, top - mark_len, top + view_height):
+                camera.rect(self.surface, color, (x, y, mark_width, mark_len))
+            for y in self._visible_dashes(center_y + yb_bottom + gap, step, self.world_height,
+                                          top - mark_len, top + view_height):
+                camera.rect(self.surface, color, (x, y, mark_width, mark_len))
+
+        # left-right markings, down the middle of each horizontal lane
+        for y in self.marking_lines['y']:
+            if not top - mark_width <= y <= top + view_height:
+                continue
+            for x in self._visible_dashes(center_x - yb_left - mark_len - gap, -step, 0,
+                                          left - mark_len, left + view_width):
+                camera.rect(self.surface, color, (x, y, mark_len, mark_width))
+            for x in self._visible_dashes(center_x + yb_right + gap, step, self.world_width,
+                                          left - mark_len, left + view_width):
+                camera.rect(self.surface, color, (x, y, mark_len, mark_width))
+
+    @staticmethod
+    def _visible_dashes(start, step, end, lo, hi):
+        """
+        Positions start, start + step, ... up to end (inclusive), restricted to [lo, hi]
+        without walking the dashes that are off screen.
+        """
+        first, last = (lo, min(hi, end)) if step > 0 else (hi, max(lo, end))
+        k = max(0, math.ceil((first - start) / step))
+        pos = start + k * step
+        while (pos <= last) if step > 0 else (pos >= last):
+            yield pos
+            pos += step
 
     def within_boundary(self, x, y):
         return 0 <= x <= self.screen_width and 0 <= y <= self.screen_height
 
     def draw_switch_traffic_button(self):
-        font = pygame.font.SysFont('Comic Sans MS', 16)
+        font = get_font('Comic Sans MS', 16)
         text = font.render('Switch', True, self.red)
         rect = self.surface.blit(text, (self.screen_width - 100, 20))
         pygame.draw.rect(self.surface, self.red, (rect.left - 5, rect.top - 5, rect.width + 10, rect.height + 10), 3)
         self.switch_traffic_button = rect
 
     def draw_fuzzy_button(self):
-        font = pygame.font.SysFont('Comic Sans MS', 16)
+        font = get_font('Comic Sans MS', 16)
         text = font.render('Calculate Fuzzy', True, self.red)
         rect = self.surface.blit(text, (self.screen_width - 150, 90))
         pygame.draw.rect(self.surface, self.blue, (rect.left - 5, rect.top - 5, rect.width + 10, rect.height + 10), 3)
         self.fuzzy_button = rect
 
     def draw_fuzzy_score(self, fuzzy_score, current_lane: DoubleLane):
-        font = pygame.font.SysFont('Sans-serif', 20)
+        font = get_font('Sans-serif', 20)
         lane_label = 'Horizontal' if current_lane == DoubleLane.Vertical else 'Vertical'
         self.surface.blit(font.render(f'Fuzzy Green Light Ext. ({lane_label} Lane): ', True, self.white), (5, 105))
         score = '-' if fuzzy_score is None else f'{fuzzy_score:.2f}s'
         self.surface.blit(font.render(score, True, self.white), (320, 105))
 
     def draw_extension_notification(self, extension, horizontal, vertical):
-        font = pygame.font.SysFont('Sans-serif', 20)
+        font = get_font('Sans-serif', 20)
         green = Config['colors']['traffic_green']
         self.surface.blit(font.render('Vehicle behind Traffic Light', True, green), (5, 125))
         self.surface.blit(font.render(f'     Horizontal : {horizontal:.1f}', True, green), (5, 145))
@@ -175,7 +196,7 @@ class BackgroundController:
         self.surface.blit(font.render(f'Green light is extended by {extension:.1f}!', True, green), (5, 185))
 
     def draw_light_durations(self, green_light_extension):
-        font = pygame.font.SysFont('Sans-serif', 20)
+        font = get_font('Sans-serif', 20)
         traffic = Config['traffic_light']
         pygame.draw.circle(self.surface, Config['colors']['traffic_red'], (self.screen_width - 180, 16), 8)
         self.surface.blit(font.render(f'Duration: {traffic["red_light_duration"]:.1f}', True, self.black),
@@ -0,0 +1,74 @@
+import math
+import time
+
+from src.Common import Lane, DoubleLane
+from src.Config import Config
+
+
+class ContinuousController:
+    """
+    Re-evaluates the fuzzy green light extension every few ticks from the
+    current queue statistics, instead of once when green is about to expire.
+
+    Changes smaller than the hysteresis band are ignored, the total green time
+    is capped, and the evaluation interval stretches whenever the measured cost
+    of an evaluation would exceed its share of the frame budget.
+    """
+
+    def __init__(self, traffic_ctrl, vehicle_ctrl):
+        self.traffic_ctrl = traffic_ctrl
+        self.vehicle_ctrl = vehicle_ctrl
+
+        cfg = Config['continuous_control']
+        self.min_interval = cfg['evaluation_interval']
+        self.hysteresis = cfg['hysteresis']
+        self.max_extension = cfg['max_green_duration'] - Config['traffic_light']['green_light_duration']
+        self.evaluation_budget = cfg['frame_budget_fraction'] / Config['simulator']['frame_rate']
+
+        self.traffic_ctrl.fuzzy.build_lookup_table(cfg['lookup_step'])
+
+        self.green_start_time = None
+        self.interval = self.min_interval
+        self.ticks_since_evaluation = 0
+        self.average_cost = 0.0
+        self.num_evaluations = 0
+
+    def _record_cost(self, seconds):
+        """Track the mean evaluation cost and widen the interval to stay within budget."""
+        self.num_evaluations += 1
+        self.average_cost += (seconds - self.average_cost) / min(self.num_evaluations, 100)
+        self.interval = max(self.min_interval, math.ceil(self.average_cost / self.evaluation_budget))
+
+    def update(self):
+        """
+        Called once per tick.
+        :return: The newly applied extension, or None if it was left unchanged
+        """
+        self.ticks_since_evaluation += 1
+        if self.ticks_since_evaluation < self.interval:
+            return None
+
+        current = self.traffic_ctrl.get_current_active_lane()
+        if current is None:
+            return None
+        self.ticks_since_evaluation = 0
+
+        # Each green phase starts from its base duration
+        green_start_time = self.traffic_ctrl.get_green_light_start_time()
+        if green_start_time != self.green_start_time:
+            self.green_start_time = green_start_time
+            self.traffic_ctrl.clear_all_green_light_extension()
+
+        start = time.perf_counter()
+        moving_averages = self.vehicle_ctrl.get_fuzzy_inputs()
+        if current == DoubleLane.Horizontal:
+            arriving, behind = moving_averages[Lane.left_to_right], moving_averages[Lane.top_to_bottom]
+        else:
+            arriving, behind = moving_averages[Lane.top_to_bottom], moving_averages[Lane.left_to_right]
+        target = min(self.traffic_ctrl.fuzzy.get_extension_interpolated(arriving, behind, 0), self.max_extension)
+        self._record_cost(time.perf_counter() - start)
+
+        if abs(target - self.traffic_ctrl.get_green_light_extension()) < self.hysteresis:
+            return None
+        self.traffic_ctrl.set_green_light_extension(target)
+        return target
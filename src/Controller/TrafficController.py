@@ -1,81 +1,41 @@
-import os
-import pygame
-
 from src.Common import TrafficStatus, DoubleLane, Lane
 from src.Config import Config
 from src.Entity.TrafficLight import TrafficLight
 from src.Fuzzy import Fuzzy
+from src.FuzzyInstrumentation import FuzzyInstrumentation
+from src.LaneGeometry import build_lane_geometry
+from src.Sprites import sprites, traffic_light_key
 
 
 class TrafficController:
     def __init__(self, surface):
         self.surface = surface
         self.fuzzy = Fuzzy()
+        if Config['fuzzy_instrumentation']['enabled']:
+            self.fuzzy.instrumentation = FuzzyInstrumentation()
         self.latest_green_light_extension = 0
 
-        # Load dimensions and config values
-        cfg = Config['traffic_light']
-        self.screen_width = Config['simulator']['screen_width']
-        self.screen_height = Config['simulator']['screen_height']
-        self.body_height = cfg['body_height']
-        self.body_width = cfg['body_width']
-        self.offset = cfg['distance_from_center']
-
+        self.geometry = build_lane_geometry()
         self.traffic_lights = {}
 
         # Initialize traffic lights
         self._init_lights()
 
     def _init_lights(self):
-        coords = {
-            Lane.left_to_right: (
-                self.screen_width / 2 - self.offset[0] - self.body_width,
-                self.screen_height / 2 - self.offset[1] - self.body_height
-            ),
-            Lane.right_to_left: (
-                self.screen_width / 2 + self.offset[0],
-                self.screen_height / 2 + self.offset[1]
-            ),
-            Lane.top_to_bottom: (
-                self.screen_height / 2 + self.offset[1],
-                self.screen_width / 2 - self.offset[0] - self.body_width
-            ),
-            Lane.bottom_to_top: (
-                self.screen_height / 2 - self.offset[1] - self.body_height,
-                self.screen_width / 2 + self.offset[0]
-            )
-        }
-
-        for lane, (x, y) in coords.items():
-            self.create_traffic_light(x, y, lane)
+        for lane, geometry in self.geometry.items():
+            self.create_traffic_light(*geometry.light, lane)
 
     def create_traffic_light(self, x, y, lane: Lane):
         """Creates and configures a traffic light for a given lane."""
-        images_dir = os.path.join(os.getcwd(), 'images', 'traffic_light')
-        rotation_map = {
-            Lane.bottom_to_top: 90,
-            Lane.right_to_left: 180,
-            Lane.top_to_bottom: 270,
-        }
-
-        rotation = rotation_map.get(lane, 0)
-        images = {
-            TrafficStatus.red: self._design_light_image(images_dir, 'traffic_light_red.png', rotation),
-            TrafficStatus.green: self._design_light_image(images_dir, 'traffic_light_green.png', rotation),
-            TrafficStatus.yellow: self._design_light_image(images_dir, 'traffic_light_yellow.png', rotation)
-        }
-
-        light = TrafficLight(x, y, lane, images, self.surface)
+        images = None
+        if self.surface is not None:
+            images = {status: sprites.get(traffic_light_key(lane, status)) for status in TrafficStatus}
+
+        light = TrafficLight(x, y, lane, images, self.surface, geometry=self.geometry[lane])
         if lane in [Lane.top_to_bottom, Lane.bottom_to_top]:
             light.change_status(TrafficStatus.red)
         self.traffic_lights[lane] = light
 
-    def _design_light_image(self, base_path, filename, rotation):
-        """Load and rotate traffic light image."""
-        img = pygame.image.load(os.path.join(base_path, filename))
-        img = pygame.transform.scale(img, (self.body_width, self.body_height))
-        return pygame.transform.rotate(img, rotation)
-
     def get_traffic_lights(self, double_lane: DoubleLane):
         """Returns the pair of traffic lights for a double lane."""
         if double_lane == DoubleLane.Horizontal:
@@ -84,13 +44,25 @@ class TrafficController:
             return [self.traffic_lights[Lane.top_to_bottom], self.traffic_lights[Lane.bottom_to_top]]
         return []
 
-    def update_and_draw_traffic_lights(self):
-        """Auto-updates each traffic light and draws them on screen."""
+    def update_traffic_lights(self):
+        """Auto-updates each traffic light."""
         for lane, light in self.traffic_lights.items():
-            opposite_status = self.get_opposite_status(lane)
-            light.auto_update(opposite_status)
-            light.draw()
-            light.draw_countdown()
+            light.auto_update(self.get_opposite_status(lane))
+
+    def draw_traffic_lights(self, camera, remaining=None):
+        """
+        Draws each traffic light and its countdown on screen.
+        :param camera: Camera mapping world coordinates to the window
+        :param remaining: Optional {Lane: seconds} overriding each light's own countdown
+        """
+        for lane, light in self.traffic_lights.items():
+            light.draw(camera)
+            light.draw_countdown(None if remaining is None else remaining[lane], camera)
+
+    def update_and_draw_traffic_lights(self, camera):
+        """Auto-updates each traffic light and draws them on screen."""
+        self.update_traffic_lights()
+        self.draw_traffic_lights(camera)
 
     def get_opposite_status(self, lane: Lane):
         """Determine the status of the perpendicular lane."""
@@ -144,6 +116,13 @@ class TrafficController:
             return self.traffic_lights[Lane.left_to_right].get_green_light_remaining_time()
         return 0
 
+    def get_green_light_start_time(self):
+        """Return when the current green phase started, or None in transition."""
+        current = self.get_current_active_lane()
+        if current is None:
+            return None
+        return self.get_traffic_lights(current)[0].start_time[TrafficStatus.green]
+
     def in_transition(self) -> bool:
         """True if currently transitioning between lanes."""
         return self.get_current_active_lane() is None
@@ -1,12 +1,15 @@
-import glob
-import pygame
 import random
+from collections import deque
 import numpy as np
 
-from src.Common import Lane
+from src.Common import Lane, TrafficStatus
 from src.Config import Config
 from src.Entity.Vehicle import Vehicle
 from src.Entity.TrafficLight import TrafficLight
+from src.Kinematics import IntelligentDriverModel
+from src.LaneIndex import LaneIndex
+from src.Sprites import sprites, vehicle_image_paths, vehicle_key
+from src.Telemetry import VehicleTelemetry
 
 
 class VehicleController:
@@ -14,30 +17,38 @@ class VehicleController:
         self.surface = surface
         self.counter = 0
 
-        self.screen_height = Config['simulator']['screen_height']
-        self.screen_width = Config['simulator']['screen_width']
         self.vehicle_width = Config['vehicle']['body_width']
         self.vehicle_length = Config['vehicle']['body_length']
-        self.bumper_distance = Config['simulator']['bumper_distance']
         self.safe_distance = Config['vehicle']['safe_distance']
         self.safe_spawn_factor = Config['vehicle']['safe_spawn_factor']
         self.frame_rate = Config['simulator']['frame_rate']
         self.moving_window = Config['simulator']['moving_averages_period']
 
         self.vehicles = {lane: [] for lane in Lane}
-        self.num_vehicles_behind_traffic = {lane: [] for lane in Lane}
-        self.vehicle_images = self._load_vehicle_images()
+        self.lane_index = {lane: LaneIndex() for lane in Lane}
+
+        # Telemetry slots of each lane's vehicles, in the same order as self.vehicles
+        self.telemetry = VehicleTelemetry() if Config['telemetry']['enabled'] else None
+        self.lane_slots = {lane: [] for lane in Lane}
+        # LoopDetectors attached by the simulator, or None
+        self.detectors = None
+        # Car following: None moves at the constant Config speed, else whole lanes step through the IDM
+        self.kinematics = IntelligentDriverModel() if Config['vehicle']['kinematics'] == 'idm' else None
+        self.num_vehicles_behind_traffic = {
+            lane: deque(maxlen=self.frame_rate * self.moving_window) for lane in Lane
+        }
+        self.num_vehicles_behind_traffic_sum = {lane: 0 for lane in Lane}
+        # Only the number of variants is needed to simulate; images load lazily
+        self.num_vehicle_images = {lane: len(vehicle_image_paths(lane)) for lane in Lane}
 
-    def _load_vehicle_images(self):
-        """Load vehicle images from folders per lane direction."""
-        image_map = {}
-        for lane in Lane:
-            dir_name = f'images/vehicles_{lane.name}/*.png'
-            image_map[lane] = [pygame.image.load(f) for f in glob.glob(dir_name)]
-        return image_map
+    def _random_image_index(self, lane: Lane):
+        return random.randrange(self.num_vehicle_images[lane]) if self.num_vehicle_images[lane] else None
 
-    def _random_image(self, lane: Lane):
-        return random.choice(self.vehicle_images[lane]) if self.vehicle_images[lane] else None
+    def _vehicle_image(self, lane: Lane, image_index):
+        """Sprite for a vehicle, loaded on first use and only when drawing."""
+        if self.surface is None:
+            return None
+        return sprites.get(vehicle_key(lane, image_index))
 
     def _last_vehicle(self, lane: Lane):
         return self.vehicles[lane][-1] if self.vehicles[lane] else None
@@ -45,75 +56,190 @@ class VehicleController:
     def get_vehicles(self, lane: Lane):
         return self.vehicles[lane]
 
+    def _stop_line_progress(self, lane: Lane):
+        # All vehicles in a lane share the same geometry
+        return self.vehicles[lane][0].geometry.stop_progress if self.vehicles[lane] else 0
+
+    def get_queue_length(self, lane: Lane):
+        """Number of vehicles behind the stop line, answered from the lane index."""
+        if not self.vehicles[lane]:
+            return 0
+        return self.lane_index[lane].count_behind(self._stop_line_progress(lane))
+
+    def get_last_vehicle_past_line(self, lane: Lane):
+        """Vehicle that most recently crossed the stop line, or None."""
+        if not self.vehicles[lane]:
+            return None
+        i = self.lane_index[lane].last_past(self._stop_line_progress(lane))
+        return None if i is None else self.vehicles[lane][i]
+
+    def add_vehicle(self, vehicle: Vehicle):
+        """Append a vehicle at the back of its lane and register it in the lane index and telemetry."""
+        self.vehicles[vehicle.lane].append(vehicle)
+        self.lane_index[vehicle.lane].append(vehicle.progress)
+        if self.telemetry is not None:
+            self.lane_slots[vehicle.lane].append(self.telemetry.start())
+
+    def clear_vehicles(self):
+        """Remove every vehicle without recording it as having left."""
+        for lane in Lane:
+            if self.telemetry is not None:
+                self.telemetry.discard(self.lane_slots[lane])
+            self.vehicles[lane] = []
+            self.lane_index[lane].rebuild([])
+            self.lane_slots[lane] = []
+
     def create_vehicle(self, lane: Lane, traffic_light: TrafficLight):
-        """Creates a new vehicle if spacing allows it."""
+        """Creates a new vehicle if spacing allows it, returning it or None."""
         if lane != traffic_light.lane:
             raise ValueError("Vehicle and traffic light must be in the same lane")
 
-        img = self._random_image(lane)
-        if img is None:
+        image_index = self._random_image_index(lane)
+        if image_index is None:
             return  # Skip if no image loaded
 
+        geometry = traffic_light.geometry
         last = self._last_vehicle(lane)
-        x, y = 0, 0
-        too_close = False
-
-        if lane == Lane.left_to_right:
-            x = 0
-            y = self.screen_height / 2 - self.vehicle_width - self.bumper_distance
-            if last and last.x - self.safe_distance * self.safe_spawn_factor < x + self.vehicle_length:
-                too_close = True
-
-        elif lane == Lane.right_to_left:
-            x = self.screen_width - self.vehicle_length
-            y = self.screen_height / 2 + self.bumper_distance
-            if last and last.x + self.vehicle_length + self.safe_distance * self.safe_spawn_factor > x:
-                too_close = True
-
-        elif lane == Lane.top_to_bottom:
-            x = self.screen_width / 2 + self.bumper_distance
-            y = 0
-            if last and last.y - self.safe_distance * self.safe_spawn_factor < y + self.vehicle_length:
-                too_close = True
-
-        elif lane == Lane.bottom_to_top:
-            x = self.screen_width / 2 - self.vehicle_width - self.bumper_distance
-            y = self.screen_height - self.vehicle_length
-            if last and last.y + self.vehicle_length + self.safe_distance * self.safe_spawn_factor > y:
-                too_close = True
-
-        if too_close:
-            return
-
-        vehicle = Vehicle(x, y, lane, img, self.surface, traffic_light)
-        self.vehicles[lane].append(vehicle)
+        if last and last.progress - self.safe_distance * self.safe_spawn_factor < \
+                geometry.spawn_progress + self.vehicle_length:
+            return  # Too close to the previous vehicle
+
+        x, y = geometry.spawn
+        vehicle = Vehicle(x, y, lane, self._vehicle_image(lane, image_index), self.surface, traffic_light,
+                          image_index=image_index)
+        if self.kinematics is not None:
+            vehicle.speed = float(self.kinematics.entry_speed(
+                last.progress - vehicle.progress - geometry.vehicle_length, last.speed
+            )) if last else self.kinematics.desired_speed
+        self.add_vehicle(vehicle)
         self.counter += 1
+        return vehicle
+
+    def update_vehicles(self):
+        """Move vehicles for all lanes."""
+        # Telemetry and detectors are folded in once per tick over all lanes
+        track = self.telemetry is not None or self.detectors is not None
+        slots, lanes, previous_keys, keys = [], [], [], []
+        speeds = [] if self.kinematics is not None else None
+        for lane, vehicles in self.vehicles.items():
+            if not vehicles:
+                continue
+            index = self.lane_index[lane]
+            # A vehicle's own position only changes when it moves, so the split
+            # between vehicles past and behind the line is fixed for this frame
+            first_behind = index.first_behind(self._stop_line_progress(lane))
+            if track:
+                slots += self.lane_slots[lane]
+                lanes += [lane.value - 1] * len(vehicles)
+                previous_keys += index.keys
+            if self.kinematics is not None:
+                self._follow_lane(vehicles, index)
+            else:
+                for i, vehicle in enumerate(vehicles):
+                    front = vehicles[i - 1] if i > 0 else None
+                    vehicle.move(front, i >= first_behind)
+                    index.update(i, vehicle.progress)
+            if track:
+                keys += index.keys
+                if speeds is not None:
+                    speeds += [vehicle.speed for vehicle in vehicles]
+
+        if track:
+            # Converted once and shared by both consumers
+            previous_keys, keys = np.array(previous_keys, dtype=np.float64), np.array(keys, dtype=np.float64)
+        if self.telemetry is not None:
+            self.telemetry.update(slots, previous_keys, keys, speeds)
+        if self.detectors is not None:
+            self.detectors.update(np.array(lanes, dtype=np.intp), previous_keys, keys)
+
+    def _follow_lane(self, vehicles, index):
+        """Step a lane's vehicles through the car-following model as arrays."""
+        geometry = vehicles[0].geometry
+        light = vehicles[0].traffic_light
+        obstacle = geometry.hold_progress if light.status != TrafficStatus.green else np.inf
+        progress, speed, acceleration = self.kinematics.step(
+            -np.array(index.keys), np.array([v.speed for v in vehicles]), geometry.vehicle_length, obstacle
+        )
+        progress = progress.tolist()
+        for vehicle, p, v, a in zip(vehicles, progress, speed.tolist(), acceleration.tolist()):
+            vehicle.set_kinematic_state(p, v, a)
+        index.rebuild(progress)
+
+    def _visible_progress_range(self, lane: Lane, camera):
+        """Progress interval of the lane inside the camera view, or None if the lane is off screen."""
+        left, top, width, height = camera.visible_rect()
+        view = {'x': (left, width), 'y': (top, height)}
+        geometry = self.vehicles[lane][0].geometry
+
+        start, extent = view[geometry.lateral_axis]
+        if not start - geometry.vehicle_breadth <= geometry.lateral <= start + extent:
+            return None
+
+        start, extent = view[geometry.axis]
+        lo, hi = start - geometry.vehicle_length, start + extent
+        if geometry.sign < 0:
+            return -hi, -lo
+        return lo, hi
+
+    def get_visible_vehicles(self, lane: Lane, camera):
+        """Vehicles of a lane inside the camera view, found by bisecting the lane index."""
+        if not self.vehicles[lane]:
+            return []
+        progress_range = self._visible_progress_range(lane, camera)
+        if progress_range is None:
+            return []
+        i, j = self.lane_index[lane].range(*progress_range)
+        return self.vehicles[lane][i:j]
+
+    def draw_vehicles(self, camera):
+        """Draw the vehicles inside the camera view."""
+        for lane in Lane:
+            for vehicle in self.get_visible_vehicles(lane, camera):
+                vehicle.draw(camera)
 
-    def update_and_draw_vehicles(self):
+    def draw_vehicle_at(self, lane: Lane, image_index, x, y, camera):
+        """Draw a vehicle published by another process, without a Vehicle object."""
+        camera.blit(self.surface, self._vehicle_image(lane, image_index), x, y)
+
+    def update_and_draw_vehicles(self, camera):
         """Move and draw vehicles for all lanes."""
-        for lane, vehicles in self.vehicles.items():
-            for i, vehicle in enumerate(vehicles):
-                front = vehicles[i - 1] if i > 0 else None
-                vehicle.move(front)
-                vehicle.draw()
+        self.update_vehicles()
+        self.draw_vehicles(camera)
 
     def destroy_vehicles_outside_canvas(self):
         """Remove vehicles that are no longer on screen."""
         for lane in Lane:
-            self.vehicles[lane] = [v for v in self.vehicles[lane] if v.inside_canvas()]
+            inside = [v.inside_canvas() for v in self.vehicles[lane]]
+            if all(inside):
+                continue
+            if self.telemetry is not None:
+                slots = self.lane_slots[lane]
+                self.telemetry.finish(lane, [slot for slot, keep in zip(slots, inside) if not keep])
+                self.lane_slots[lane] = [slot for slot, keep in zip(slots, inside) if keep]
+            self.vehicles[lane] = [v for v, keep in zip(self.vehicles[lane], inside) if keep]
+            self.lane_index[lane].rebuild(v.progress for v in self.vehicles[lane])
 
     def update_num_vehicles_behind_traffic(self):
         """Track number of vehicles behind red lights and maintain moving average."""
-        max_len = self.frame_rate * self.moving_window
         for lane in Lane:
-            count = sum(1 for v in self.vehicles[lane] if v.is_behind_traffic_light())
-            self.num_vehicles_behind_traffic[lane].append(count)
-            if len(self.num_vehicles_behind_traffic[lane]) > max_len:
-                self.num_vehicles_behind_traffic[lane].pop(0)
+            window = self.num_vehicles_behind_traffic[lane]
+            count = self.get_queue_length(lane)
+            # Running sum keeps the moving average O(1) to read
+            if len(window) == window.maxlen:
+                self.num_vehicles_behind_traffic_sum[lane] -= window[0]
+            window.append(count)
+            self.num_vehicles_behind_traffic_sum[lane] += count
+
+    def get_fuzzy_inputs(self):
+        """Per-lane queue measure fed to the fuzzy controller: detector estimates or exact moving averages."""
+        if self.detectors is not None and Config['detectors']['fuzzy_inputs']:
+            return self.detectors.queue_estimates()
+        return self.get_moving_averages_num_vehicles_behind_traffic()
 
     def get_moving_averages_num_vehicles_behind_traffic(self):
         """Return moving average per lane for vehicles behind traffic."""
         return {
-            lane: np.mean(self.num_vehicles_behind_traffic[lane]) if self.num_vehicles_behind_traffic[lane] else 0
+            lane: self.num_vehicles_behind_traffic_sum[lane] / len(self.num_vehicles_behind_traffic[lane])
+            if self.num_vehicles_behind_traffic[lane] else 0
             for lane in Lane
         }
@@ -0,0 +1,150 @@
+import concurrent.futures
+import multiprocessing
+import threading
+import time
+import numpy as np
+
+from src.Config import Config
+
+# Fuzzy controller of a decision worker process, built once by _init_worker
+_worker_fuzzy = None
+
+
+def _init_worker(fuzzy_config):
+    """Build the worker's fuzzy controller from the parent's fuzzy Config."""
+    global _worker_fuzzy
+    from src.Fuzzy import Fuzzy
+    Config['fuzzy'] = fuzzy_config
+    _worker_fuzzy = Fuzzy()
+
+
+def _decide(arriving, behind, extension_count):
+    return _worker_fuzzy.get_extension(arriving, behind, extension_count)
+
+
+class DecisionPipeline:
+    """
+    Takes phase-end fuzzy decisions off the frame.
+
+    The decision is submitted to a worker thread or process `lead_time`
+    simulated seconds before it is needed, with the queue statistics of that
+    moment, and collected when the green reaches seconds_before_extension.
+    A result that is not ready by then, optionally after waiting up to `wait`
+    wall seconds, is a deadline miss and gives the zero extension, as does a
+    decision that raised.
+    Latencies are measured on the wall clock, from submission until the
+    result arrived, and kept in a fixed log-spaced histogram. A miss is
+    recorded with the time it had taken by the deadline, so an overloaded
+    pipeline does not hide its slowest decisions.
+    """
+
+    def __init__(self, fuzzy, cfg=None):
+        """
+        :param fuzzy: Fuzzy controller used by a thread executor
+        :param cfg: Config['decision_pipeline'] by default
+        """
+        cfg = Config['decision_pipeline'] if cfg is None else cfg
+        self.lead_time = cfg['lead_time']
+        self.wait = cfg['wait']
+        self.fuzzy = fuzzy
+        if cfg['executor'] == 'process':
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker, initargs=(Config['fuzzy'],)
+            )
+        elif cfg['executor'] == 'thread':
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        else:
+            raise ValueError(f"Unknown decision executor {cfg['executor']!r}")
+        self.process = cfg['executor'] == 'process'
+
+        # Submitted decision: (key, future, submission wall time), or None
+        self.pending = None
+        self.lock = threading.Lock()
+
+        self.decisions = 0
+        self.misses = 0            # results not ready at the deadline, replaced by the fallback
+        self.unsubmitted = 0       # deadlines reached with nothing submitted for them
+        self.errors = 0            # decisions that raised
+        self.measured = 0          # decisions with a latency: results that arrived, and misses
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_edges = np.geomspace(1e-5, 10, cfg['latency_bins'] + 1)
+        self.latency_histogram = np.zeros(cfg['latency_bins'], dtype=np.int64)
+
+    def submit(self, key, arriving, behind, extension_count):
+        """
+        Start the decision identified by `key` (e.g. the start time of the green it extends).
+        A decision already pending is superseded and will count as a miss if collected.
+        """
+        submitted = time.perf_counter()
+        if self.process:
+            future = self.executor.submit(_decide, arriving, behind, extension_count)
+        else:
+            future = self.executor.submit(self.fuzzy.get_extension, arriving, behind, extension_count)
+        future.add_done_callback(lambda f: self._record_latency(f, submitted))
+        self.pending = (key, future, submitted)
+
+    def is_pending(self, key):
+        return self.pending is not None and self.pending[0] == key
+
+    def _record_latency(self, future, submitted):
+        # Runs on whichever thread completed the future, or on the caller at a miss;
+        # whichever comes first records the decision
+        if future.cancelled():
+            return
+        latency = time.perf_counter() - submitted
+        i = int(np.clip(np.searchsorted(self.latency_edges, latency) - 1, 0, len(self.latency_histogram) - 1))
+        with self.lock:
+            if getattr(future, 'latency_recorded', False):
+                return
+            future.latency_recorded = True
+            self.measured += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.latency_histogram[i] += 1
+
+    def collect(self, key, fallback=0.0):
+        """Result of the decision `key` if it is ready by now, else `fallback`."""
+        self.decisions += 1
+        if not self.is_pending(key):
+            self.unsubmitted += 1
+            return fallback
+        _, future, submitted = self.pending
+        self.pending = None
+        try:
+            return future.result(timeout=self.wait)
+        except concurrent.futures.TimeoutError:
+            self._record_latency(future, submitted)
+            future.cancel()
+            self.misses += 1
+        except Exception:
+            # e.g. no rule fired; the synchronous path would have failed the frame
+            self.errors += 1
+        return fallback
+
+    def cancel(self):
+        """Drop the pending decision, e.g. when the state it was taken from is replaced."""
+        if self.pending is not None:
+            self.pending[1].cancel()
+            self.pending = None
+
+    def summary(self):
+        with self.lock:
+            measured = max(self.measured, 1)
+            cumulative = np.cumsum(self.latency_histogram)
+            p95 = self.latency_edges[1:][np.searchsorted(cumulative, 0.95 * cumulative[-1])] \
+                if self.measured else 0.0
+            return {
+                'decisions': self.decisions,
+                'deadline_misses': self.misses + self.unsubmitted,
+                'miss_rate': (self.misses + self.unsubmitted) / max(self.decisions, 1),
+                'errors': self.errors,
+                'mean_latency': self.latency_sum / measured,
+                'p95_latency': float(p95),  # upper edge of the histogram bin
+                'max_latency': self.latency_max
+            }
+
+    def close(self):
+        self.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,140 @@
+import random
+import numpy as np
+
+from src.Common import Lane
+from src.Config import Config
+
+ARRIVAL_DTYPE = np.dtype([
+    ('time', np.float64),
+    ('lane', np.int8)
+])
+
+
+def profile_multiplier(profile, t):
+    """
+    Demand multiplier at times t (seconds since the start of the run).
+    :param profile: [(seconds, multiplier), ...] breakpoints, interpolated linearly
+        and repeated with the period of the last breakpoint; None for flat demand
+    """
+    if profile is None:
+        return np.ones_like(t)
+    seconds, multipliers = np.array(profile, dtype=np.float64).T
+    return np.interp(np.mod(t, seconds[-1]), seconds, multipliers)
+
+
+def poisson_arrivals(rng, rates, start, end):
+    """
+    Homogeneous Poisson arrivals for every lane at once.
+    :param rates: Vehicles per second, one entry per lane
+    :return: (times, lane indices), unsorted
+    """
+    counts = rng.poisson(np.asarray(rates) * (end - start))
+    times = rng.uniform(start, end, counts.sum())
+    return times, np.repeat(np.arange(len(counts)), counts)
+
+
+def platoon_arrivals(rng, rates, mean_size, headway, start, end):
+    """
+    Platoons whose leaders arrive as a Poisson process over [start, end) and whose
+    sizes are geometric with the given mean; followers trail the leader by `headway`
+    seconds, past `end` for platoons led shortly before it. Since no follower is
+    dropped, the average flow over consecutive draws still equals `rates`.
+    """
+    leaders, lanes = poisson_arrivals(rng, np.asarray(rates) / mean_size, start, end)
+    sizes = rng.geometric(1 / mean_size, len(leaders))
+    # Position of each vehicle within its platoon
+    position = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    times = np.repeat(leaders, sizes) + headway * position
+    return times, np.repeat(lanes, sizes)
+
+
+def generate_arrivals(rng, start, end, origin, cfg=None):
+    """
+    Draw the arrivals of every lane over [start, end) as one sorted schedule.
+    Platoon followers may arrive after `end`.
+    Time-of-day profiles are applied by thinning arrivals drawn at the peak rate.
+    :param origin: Clock time at which the demand profile starts
+    :param cfg: Demand settings, Config['demand'] by default
+    """
+    cfg = Config['demand'] if cfg is None else cfg
+    rates = np.array([cfg['flow'][lane.name] for lane in Lane], dtype=np.float64) / 3600
+    peak = 1.0 if cfg['profile'] is None else max(m for _, m in cfg['profile'])
+
+    if cfg['arrivals'] == 'poisson':
+        times, lanes = poisson_arrivals(rng, rates * peak, start, end)
+    elif cfg['arrivals'] == 'platoon':
+        times, lanes = platoon_arrivals(rng, rates * peak, cfg['platoon_size'], cfg['platoon_headway'], start, end)
+    else:
+        raise ValueError(f"Unknown arrival model: {cfg['arrivals']}")
+
+    if cfg['profile'] is not None:
+        keep = rng.random(len(times)) * peak < profile_multiplier(cfg['profile'], times - origin)
+        times, lanes = times[keep], lanes[keep]
+
+    schedule = np.empty(len(times), dtype=ARRIVAL_DTYPE)
+    schedule['time'] = times
+    schedule['lane'] = lanes + 1  # Lane values start at 1
+    schedule.sort(order='time')
+    return schedule
+
+
+class ArrivalSchedule:
+    """
+    Pre-generated arrivals, consumed by the simulator as the clock passes them.
+
+    Arrivals are drawn a whole horizon at a time. A vehicle whose entry is
+    blocked by the previous one stays due and enters as soon as there is room,
+    so demand above the lane capacity builds up instead of being dropped.
+    """
+
+    def __init__(self, origin):
+        """
+        :param origin: Clock time at which the run and its demand profile start
+        """
+        self.horizon = Config['demand']['horizon']
+        self.origin = origin
+        self.end = origin
+        self.times = {lane: np.empty(0) for lane in Lane}
+        self.cursor = {lane: 0 for lane in Lane}
+        self.extend()
+
+    def extend(self):
+        """Drop consumed arrivals and draw the next horizon."""
+        # Seeded from `random` so runs and snapshot restores stay reproducible
+        rng = np.random.default_rng(random.getrandbits(64))
+        schedule = generate_arrivals(rng, self.end, self.end + self.horizon, self.origin)
+        for lane in Lane:
+            new = schedule['time'][schedule['lane'] == lane.value]
+            # Sorted again, as platoons of the last draw may trail into this one
+            self.times[lane] = np.sort(np.concatenate([self.times[lane][self.cursor[lane]:], new]))
+            self.cursor[lane] = 0
+        self.end += self.horizon
+
+    def due(self, lane: Lane, now):
+        """Number of arrivals on a lane at or before `now` that have not entered yet."""
+        return int(np.searchsorted(self.times[lane], now, side='right')) - self.cursor[lane]
+
+    def pop(self, lane: Lane):
+        """Mark the earliest due arrival of a lane as entered."""
+        self.cursor[lane] += 1
+
+    def remaining(self):
+        """Arrivals not entered yet, as one sorted ARRIVAL_DTYPE schedule."""
+        parts = []
+        for lane in Lane:
+            times = self.times[lane][self.cursor[lane]:]
+            part = np.empty(len(times), dtype=ARRIVAL_DTYPE)
+            part['time'] = times
+            part['lane'] = lane.value
+            parts.append(part)
+        schedule = np.concatenate(parts)
+        schedule.sort(order='time')
+        return schedule
+
+    def restore(self, schedule, end, origin):
+        """Replace the pending arrivals, e.g. when loading a snapshot."""
+        for lane in Lane:
+            self.times[lane] = np.array(schedule['time'][schedule['lane'] == lane.value], dtype=np.float64)
+            self.cursor[lane] = 0
+        self.end = end
+        self.origin = origin
@@ -0,0 +1,118 @@
+import numpy as np
+
+from src.Common import Lane
+from src.Config import Config
+
+
+class LoopDetectors:
+    """
+    Virtual loop detectors at fixed distances upstream of each stop line.
+
+    Every tick, all vehicles are checked against all detectors at once by
+    comparing their progress before and after moving. Crossings and occupied
+    ticks are aggregated into fixed-length count and occupancy series, one
+    value per interval. The vehicles between the outermost detector and the
+    stop line detector, counted in minus counted out, give a queue estimate
+    that can stand in for the exact queue counts as fuzzy input.
+    """
+
+    def __init__(self, geometry):
+        """
+        :param geometry: {Lane: LaneGeometry}, as built by the TrafficController
+        """
+        cfg = Config['detectors']
+        self.distances = np.array(cfg['distances'], dtype=np.float64)
+        self.zone = cfg['length']
+        self.interval_ticks = round(cfg['interval'] * Config['simulator']['frame_rate'])
+        num_detectors = len(self.distances)
+
+        # Progress is the rear of a vehicle on lanes of sign +1 and its front on lanes of
+        # sign -1; detectors work on the front, so that a zone is the same stretch of road
+        # whatever the direction
+        self.vehicle_length = np.array([[geometry[lane].vehicle_length] for lane in Lane], dtype=np.float64)
+        self.front_offset = np.where(
+            np.array([[geometry[lane].sign] for lane in Lane]) > 0, self.vehicle_length, 0.0
+        )
+        # Detector k of lane i sits at front progress positions[i, k]
+        stop = np.array([geometry[lane].stop_progress for lane in Lane], dtype=np.float64)
+        self.positions = (stop + self.front_offset[:, 0])[:, None] - self.distances[None, :]
+        self.cells = np.arange(len(Lane) * num_detectors).reshape(len(Lane), num_detectors)
+        self.upstream = int(self.distances.argmax())
+        self.downstream = int(self.distances.argmin())
+
+        # Accumulators of the interval in progress
+        self.ticks = 0
+        self.counts = np.zeros((len(Lane), num_detectors), dtype=np.int64)
+        self.occupied_ticks = np.zeros((len(Lane), num_detectors), dtype=np.int64)
+        self.between = np.zeros(len(Lane), dtype=np.int64)
+        self.between_sum = np.zeros(len(Lane), dtype=np.int64)
+
+        # Completed intervals, oldest first once the ring has wrapped
+        history = cfg['history']
+        self.count_history = np.zeros((history, len(Lane), num_detectors), dtype=np.int32)
+        self.occupancy_history = np.zeros((history, len(Lane), num_detectors), dtype=np.float32)
+        self.queue_history = np.zeros((history, len(Lane)), dtype=np.float32)
+        self.num_intervals = 0
+
+    def update(self, lanes, previous_keys, keys):
+        """
+        Fold one tick in.
+        :param lanes: Array of the lane index (Lane.value - 1) of every vehicle on the road
+        :param previous_keys: Array of their LaneIndex keys (negated progress) before moving
+        :param keys: Array of their keys after moving
+        """
+        self.ticks += 1
+        if len(lanes):
+            front_offset = self.front_offset[lanes]
+            previous = -previous_keys[:, None] + front_offset
+            current = -keys[:, None] + front_offset
+            positions = self.positions[lanes]
+
+            # A detector counts a vehicle once, on the tick its front moves past it
+            crossed = (previous <= positions) & (current > positions)
+            # The vehicle covers [front - length, front], the zone [position, position + length]
+            occupied = (current >= positions) & (current - self.vehicle_length[lanes] <= positions + self.zone)
+
+            # Flat (lane, detector) cell of every vehicle-detector pair
+            cells = self.cells[lanes]
+            counts = np.bincount(cells[crossed], minlength=self.counts.size).reshape(self.counts.shape)
+            self.counts += counts
+            self.between += counts[:, self.upstream] - counts[:, self.downstream]
+            occupants = np.bincount(cells[occupied], minlength=self.counts.size).reshape(self.counts.shape)
+            self.occupied_ticks += occupants > 0
+        self.between_sum += self.between
+
+        if self.ticks == self.interval_ticks:
+            self._close_interval()
+
+    def _close_interval(self):
+        i = self.num_intervals % len(self.count_history)
+        self.count_history[i] = self.counts
+        self.occupancy_history[i] = self.occupied_ticks / self.ticks
+        self.queue_history[i] = self.between_sum / self.ticks
+        self.num_intervals += 1
+
+        self.ticks = 0
+        self.counts[:] = 0
+        self.occupied_ticks[:] = 0
+        self.between_sum[:] = 0
+
+    def _series(self, history):
+        n = min(self.num_intervals, len(history))
+        start = self.num_intervals % len(history) if self.num_intervals > len(history) else 0
+        return np.roll(history, -start, axis=0)[:n]
+
+    def count_series(self, lane: Lane):
+        """Vehicles crossing each detector per interval: (intervals, detectors), oldest first."""
+        return self._series(self.count_history)[:, lane.value - 1]
+
+    def occupancy_series(self, lane: Lane):
+        """Fraction of each interval each detector was occupied: (intervals, detectors)."""
+        return self._series(self.occupancy_history)[:, lane.value - 1]
+
+    def queue_estimates(self):
+        """Mean vehicles between the outermost and the stop line detector over the last interval."""
+        if self.num_intervals == 0:
+            return {lane: float(self.between[lane.value - 1]) for lane in Lane}
+        last = self.queue_history[(self.num_intervals - 1) % len(self.queue_history)]
+        return {lane: float(last[lane.value - 1]) for lane in Lane}
@@ -1,8 +1,9 @@
-import time
 import pygame
 
-from src.Common import TrafficStatus, Lane
+from src.Common import TrafficStatus
+from src.Clock import clock
 from src.Config import Config
+from src.Sprites import get_font
 
 
 class TrafficLight:
@@ -11,12 +12,16 @@ class TrafficLight:
     Manages light status, timing, and drawing to the simulation surface.
     """
 
-    def __init__(self, x, y, lane, images, surface, status=TrafficStatus.green):
+    def __init__(self, x, y, lane, images, surface, status=TrafficStatus.green, geometry=None):
+        """
+        :param geometry: LaneGeometry of the lane, shared with the lane's vehicles
+        """
         self.x = x
         self.y = y
         self.lane = lane
         self.surface = surface
-        self.images = images  # {TrafficStatus: pygame.Surface}
+        self.images = images  # {TrafficStatus: pygame.Surface}, None when no renderer is attached
+        self.geometry = geometry
 
         self.duration = {
             TrafficStatus.green: Config['traffic_light']['green_light_duration'],
@@ -30,7 +35,7 @@ class TrafficLight:
             TrafficStatus.red: 0
         }
 
-        current_time = time.time()
+        current_time = clock.now()
         self.start_time = {
             TrafficStatus.green: current_time,
             TrafficStatus.yellow: current_time,
@@ -55,21 +60,24 @@ class TrafficLight:
     def center_y(self):
         return self.y + self.height / 2
 
-    def draw(self):
+    def draw(self, camera=None):
         """Render the traffic light image based on current status."""
-        self.surface.blit(self.images[self.status], (self.x, self.y))
+        if camera is None:
+            self.surface.blit(self.images[self.status], (self.x, self.y))
+        else:
+            camera.blit(self.surface, self.images[self.status], self.x, self.y)
 
     def change_status(self, status: TrafficStatus):
         """Manually change the traffic light status."""
         self.status = status
-        self.start_time[status] = time.time()
+        self.start_time[status] = clock.now()
 
     def auto_update(self, opposite_status: TrafficStatus):
         """
         Automatically transitions traffic light state after the duration.
         Prevents green-to-green clashes with the opposite light.
         """
-        elapsed = time.time() - self.start_time[self.status]
+        elapsed = clock.now() - self.start_time[self.status]
         total_duration = self.duration[self.status] + self.duration_extension[self.status]
         remaining = total_duration - elapsed
 
@@ -87,32 +95,30 @@ class TrafficLight:
                 return
             self.status = TrafficStatus.green
 
-        self.start_time[self.status] = time.time()
+        self.start_time[self.status] = clock.now()
         return self.status
 
-    def draw_countdown(self):
+    def draw_countdown(self, remaining=None, camera=None):
         """Draw countdown timer near the traffic light."""
-        remaining = self.get_green_light_remaining_time()
+        if remaining is None:
+            remaining = self.get_green_light_remaining_time()
         color = {
             TrafficStatus.green: Config['colors']['traffic_green'],
             TrafficStatus.yellow: Config['colors']['traffic_yellow'],
             TrafficStatus.red: Config['colors']['traffic_red']
         }.get(self.status, Config['colors']['black'])
 
-        font = pygame.font.SysFont('Comic Sans MS', 12, True)
+        font = get_font('Comic Sans MS', 12, bold=True)
         text = font.render(f"{round(max(0, remaining), 1)}", True, color)
 
         # Position label based on lane orientation
-        pos_x, pos_y = self.x, self.y
-        if self.lane == Lane.left_to_right:
-            pos_y -= self.height
-        elif self.lane == Lane.right_to_left:
-            pos_y += self.height * 1.25
-        elif self.lane == Lane.top_to_bottom:
-            pos_x += self.width * 2
-        elif self.lane == Lane.bottom_to_top:
-            pos_x -= self.width * 2
+        dx, dy = self.geometry.countdown_offset
+        pos_x, pos_y = self.x + dx, self.y + dy
 
+        if camera is not None:
+            if not camera.is_visible(pos_x, pos_y, self.width, self.height):
+                return
+            pos_x, pos_y = camera.to_screen(pos_x, pos_y)
         self.surface.blit(text, (pos_x, pos_y))
 
     def set_green_light_extension(self, extension):
@@ -121,5 +127,5 @@ class TrafficLight:
 
     def get_green_light_remaining_time(self):
         """Returns the remaining time for the current light phase."""
-        elapsed = time.time() - self.start_time[self.status]
+        elapsed = clock.now() - self.start_time[self.status]
         return max(0.0, self.duration[self.status] + self.duration_extension[self.status] - elapsed)
@@ -1,6 +1,4 @@
-import pygame
 from src.Common import Lane, TrafficStatus
-from src.Config import Config
 
 
 class Vehicle:
@@ -9,7 +7,10 @@ class Vehicle:
     Handles drawing, movement, and interactions with traffic lights.
     """
 
-    def __init__(self, x, y, lane: Lane, image, surface, traffic_light):
+    def __init__(self, x, y, lane: Lane, image, surface, traffic_light, image_index=0):
+        """
+        :param image: Pre-scaled sprite, or None when no renderer is attached
+        """
         if lane != traffic_light.lane:
             raise Exception('Vehicle and Traffic Light must belong to the same lane.')
 
@@ -18,22 +19,17 @@ class Vehicle:
         self.lane = lane
         self.surface = surface
         self.traffic_light = traffic_light
-
-        # Scale vehicle image according to direction
-        if lane in [Lane.left_to_right, Lane.right_to_left]:
-            size = (Config['vehicle']['body_length'], Config['vehicle']['body_width'])
-        else:
-            size = (Config['vehicle']['body_width'], Config['vehicle']['body_length'])
-
-        self.image = pygame.transform.scale(image, size)
-
-    @property
-    def width(self):
-        return self.image.get_width()
-
-    @property
-    def height(self):
-        return self.image.get_height()
+        self.image_index = image_index
+        self.image = image
+
+        # Everything lane-specific comes from the precomputed lane geometry
+        self.geometry = traffic_light.geometry
+        self.width, self.height = self.geometry.vehicle_size
+        # Longitudinal position along the direction of travel, kept in step with x / y
+        self.progress = self.geometry.sign * getattr(self, self.geometry.axis)
+        # Pixels per second (squared); only tracked with IDM kinematics
+        self.speed = 0.0
+        self.acceleration = 0.0
 
     @property
     def center_x(self):
@@ -43,59 +39,49 @@ class Vehicle:
     def center_y(self):
         return self.y + self.height / 2
 
-    def draw(self):
-        """Render vehicle onto the surface."""
-        self.surface.blit(self.image, (self.x, self.y))
-
-    def move(self, front_vehicle=None):
-        """Handles vehicle motion and safe stopping."""
-        speed = Config['vehicle']['speed']
-        safe_distance = Config['vehicle']['safe_distance']
-        stopping_due_to_signal = self.traffic_light.status != TrafficStatus.green and self.is_behind_traffic_light()
-
-        if self.lane == Lane.left_to_right:
-            self.x += speed
-            if front_vehicle:
-                self.x = min(self.x, front_vehicle.x - safe_distance - self.width)
-            if stopping_due_to_signal:
-                self.x = min(self.x, self.traffic_light.x - self.traffic_light.width / 2 - self.width)
-
-        elif self.lane == Lane.right_to_left:
-            self.x -= speed
-            if front_vehicle:
-                self.x = max(self.x, front_vehicle.x + front_vehicle.width + safe_distance)
-            if stopping_due_to_signal:
-                self.x = max(self.x, self.traffic_light.x + self.traffic_light.width * 1.5)
+    def stop_line_progress(self):
+        """Largest progress at which the vehicle still counts as behind the traffic light."""
+        return self.geometry.stop_progress
 
-        elif self.lane == Lane.top_to_bottom:
-            self.y += speed
-            if front_vehicle:
-                self.y = min(self.y, front_vehicle.y - safe_distance - self.height)
-            if stopping_due_to_signal:
-                self.y = min(self.y, self.traffic_light.y - self.traffic_light.height / 2 - self.height)
-
-        elif self.lane == Lane.bottom_to_top:
-            self.y -= speed
-            if front_vehicle:
-                self.y = max(self.y, front_vehicle.y + front_vehicle.height + safe_distance)
-            if stopping_due_to_signal:
-                self.y = max(self.y, self.traffic_light.y + self.traffic_light.height)
+    def draw(self, camera=None):
+        """Render vehicle onto the surface."""
+        if camera is None:
+            self.surface.blit(self.image, (self.x, self.y))
+        else:
+            camera.blit(self.surface, self.image, self.x, self.y)
+
+    def move(self, front_vehicle=None, behind_traffic_light=None):
+        """
+        Handles vehicle motion and safe stopping.
+        :param front_vehicle: Vehicle directly ahead in the same lane, if any
+        :param behind_traffic_light: Precomputed result of is_behind_traffic_light(), if known
+        """
+        if behind_traffic_light is None:
+            behind_traffic_light = self.is_behind_traffic_light()
+        stopping_due_to_signal = self.traffic_light.status != TrafficStatus.green and behind_traffic_light
+
+        geometry = self.geometry
+        progress = self.progress + geometry.step
+        if front_vehicle:
+            progress = min(progress, front_vehicle.progress - geometry.follow_distance)
+        if stopping_due_to_signal:
+            progress = min(progress, geometry.hold_progress)
+
+        self.progress = progress
+        setattr(self, geometry.axis, geometry.sign * progress)
+
+    def set_kinematic_state(self, progress, speed, acceleration):
+        """Apply a position and speed computed for the whole lane at once (IDM kinematics)."""
+        self.progress = progress
+        self.speed = speed
+        self.acceleration = acceleration
+        setattr(self, self.geometry.axis, self.geometry.sign * progress)
 
     def is_behind_traffic_light(self):
         """Returns True if the vehicle is behind the traffic light (used for stopping logic)."""
-        if self.lane == Lane.left_to_right:
-            return self.x + self.width <= self.traffic_light.x + self.traffic_light.width
-        elif self.lane == Lane.right_to_left:
-            return self.traffic_light.x + self.traffic_light.width <= self.x
-        elif self.lane == Lane.top_to_bottom:
-            return self.y + self.height <= self.traffic_light.y
-        elif self.lane == Lane.bottom_to_top:
-            return self.traffic_light.y + self.traffic_light.height <= self.y
-        return False
+        return self.progress <= self.geometry.stop_progress
 
     def inside_canvas(self) -> bool:
-        """Checks if the vehicle is still within the screen boundaries."""
-        return (
-            0 <= self.x <= Config['simulator']['screen_width'] - self.width and
-            0 <= self.y <= Config['simulator']['screen_height'] - self.height
-        )
+        """Checks if the vehicle is still within the world boundaries."""
+        max_x, max_y = self.geometry.max_position
+        return 0 <= self.x <= max_x and 0 <= self.y <= max_y
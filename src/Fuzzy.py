@@ -39,8 +39,20 @@ class Fuzzy:
             'long': fuzz.trimf(self.x_extension, mf['long'])
         }
 
+        # Inputs saturate at the peaks of the outer terms, so that queues past the last
+        # breakpoint still count as fully 'many' instead of firing no rule at all
+        mf = Config['fuzzy']['membership_function']
+        self.arriving_bounds = (mf['arriving_green_light']['few'][1], mf['arriving_green_light']['many'][1])
+        self.behind_bounds = (mf['behind_red_light']['few'][1], mf['behind_red_light']['many'][1])
+
+        self.lookup = None
+        # FuzzyInstrumentation recording every decision, or None (the default) to skip it
+        self.instrumentation = None
+
     def _fuzzify(self, arriving_val, behind_val):
         """Fuzzify crisp inputs to degrees of membership."""
+        arriving_val = np.clip(arriving_val, *self.arriving_bounds)
+        behind_val = np.clip(behind_val, *self.behind_bounds)
         arriving_levels = {
             k: fuzz.interp_membership(self.x_arriving_green_light, v, arriving_val)
             for k, v in self.arriving.items()
@@ -51,10 +63,8 @@ class Fuzzy:
         }
         return arriving_levels, behind_levels
 
-    def _evaluate_rules(self, arriving, behind, extension_count):
-        """Evaluate fuzzy rules and return aggregated membership output."""
-
-        # Define fuzzy rules
+    def _fire_rules(self, arriving, behind):
+        """Strength of each fuzzy rule for the fuzzified inputs."""
         rule = {}
         rule['r1'] = arriving['few']
         rule['r2'] = np.fmin(arriving['small'], np.fmax(behind['few'], behind['small']))
@@ -64,7 +74,10 @@ class Fuzzy:
         rule['r6'] = np.fmin(arriving['many'], behind['few'])
         rule['r7'] = np.fmin(arriving['many'], np.fmax(behind['small'], behind['medium']))
         rule['r8'] = np.fmin(arriving['many'], behind['many'])
+        return rule
 
+    def _evaluate_rules(self, rule, extension_count):
+        """Combine fired rules into the aggregated output membership."""
         if extension_count == 0:
             activations = {
                 'zero': np.fmax(rule['r1'], rule['r3']),
@@ -77,7 +90,7 @@ class Fuzzy:
                 'zero': np.fmax(rule['r1'], np.fmax(rule['r2'], np.fmax(rule['r3'], np.fmax(rule['r5'], rule['r8'])))),
                 'short': np.fmax(rule['r4'], rule['r7']),
                 'medium': rule['r6'],
-                'long': 0  # no further extension after first
+                'long': np.zeros_like(rule['r6'])  # no further extension after first
             }
 
         # Apply rule activation to output membership functions
@@ -99,5 +112,83 @@ class Fuzzy:
         :return: crisp extension value (seconds)
         """
         arriving_levels, behind_levels = self._fuzzify(arriving_green_light_car, behind_red_light_car)
-        fuzzy_result = self._evaluate_rules(arriving_levels, behind_levels, extension_count)
-        return fuzz.defuzz(self.x_extension, fuzzy_result, 'centroid')
+        rules = self._fire_rules(arriving_levels, behind_levels)
+        fuzzy_result = self._evaluate_rules(rules, extension_count)
+        extension = fuzz.defuzz(self.x_extension, fuzzy_result, 'centroid')
+        if self.instrumentation is not None:
+            self.instrumentation.record(arriving_green_light_car, behind_red_light_car, extension_count,
+                                        rules, fuzzy_result, extension)
+        return extension
+
+    def get_extension_batch(self, arriving_green_light_car, behind_red_light_car, extension_count):
+        """
+        get_extension for arrays of inputs at once, e.g. one decision per batched environment.
+        Decisions where no output term is activated give 0 instead of raising.
+        :return: Array of crisp extensions (seconds), one per input pair
+        """
+        arriving = np.asarray(arriving_green_light_car, dtype=np.float64)[:, None]
+        behind = np.asarray(behind_red_light_car, dtype=np.float64)[:, None]
+        rules = self._fire_rules(*self._fuzzify(arriving, behind))
+        fuzzy_result = self._evaluate_rules(rules, extension_count)  # (decisions, extension universe)
+        return centroid(self.x_extension, fuzzy_result)
+
+    def build_lookup_table(self, step):
+        """
+        Tabulate get_extension over a grid of both inputs so that it can be
+        re-evaluated every tick by bilinear interpolation.
+        The grid stops below the last membership breakpoint; inputs saturate before it.
+        :param step: Grid spacing in vehicles
+        """
+        mf = Config['fuzzy']['membership_function']
+        grid_arriving = np.arange(0, max(max(v) for v in mf['arriving_green_light'].values()), step)
+        grid_behind = np.arange(0, max(max(v) for v in mf['behind_red_light'].values()), step)
+
+        # Tabulating is not a decision, so keep it out of the instrumentation
+        instrumentation, self.instrumentation = self.instrumentation, None
+        table = np.empty((2, len(grid_arriving), len(grid_behind)))
+        for extension_count in range(2):
+            for i, arriving in enumerate(grid_arriving):
+                for j, behind in enumerate(grid_behind):
+                    table[extension_count, i, j] = self.get_extension(arriving, behind, extension_count)
+        self.instrumentation = instrumentation
+
+        self.lookup = (step, len(grid_arriving) - 1, len(grid_behind) - 1, table.tolist())
+
+    def get_extension_interpolated(self, arriving_green_light_car, behind_red_light_car, extension_count):
+        """
+        Cheap approximation of get_extension from the table built by build_lookup_table.
+        Inputs beyond the grid saturate at its edge.
+        """
+        step, max_i, max_j, table = self.lookup
+        rows = table[min(extension_count, 1)]
+
+        a = min(max(arriving_green_light_car / step, 0), max_i)
+        b = min(max(behind_red_light_car / step, 0), max_j)
+        i, j = min(int(a), max_i - 1), min(int(b), max_j - 1)
+        fa, fb = a - i, b - j
+
+        top = rows[i][j] * (1 - fb) + rows[i][j + 1] * fb
+        bottom = rows[i + 1][j] * (1 - fb) + rows[i + 1][j + 1] * fb
+        extension = top * (1 - fa) + bottom * fa
+        if self.instrumentation is not None:
+            # Rule strengths are not tabulated; fire the rules only when someone is watching
+            rules = self._fire_rules(*self._fuzzify(arriving_green_light_car, behind_red_light_car))
+            self.instrumentation.record(arriving_green_light_car, behind_red_light_car, extension_count,
+                                        rules, self._evaluate_rules(rules, extension_count), extension)
+        return extension
+
+
+def centroid(x, mfx):
+    """
+    Centroid defuzzification of each row of mfx over the universe x, as skfuzzy
+    computes it: piecewise-linear membership integrated segment by segment.
+    Rows without any activation give 0.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    dx = np.diff(x)
+    y1, y2 = mfx[:, :-1], mfx[:, 1:]
+    # Area of each trapezoid and its first moment about 0
+    area = 0.5 * dx * (y1 + y2)
+    moment = dx * dx / 3 * (y2 + 0.5 * y1) + x[:-1] * area
+    total = area.sum(axis=1)
+    return np.where(total > 0, moment.sum(axis=1) / np.maximum(total, np.finfo(np.float64).eps), 0.0)
@@ -0,0 +1,113 @@
+import numpy as np
+
+from src.Config import Config
+
+RULES = ['r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8']
+
+
+class FuzzyInstrumentation:
+    """
+    Bounded-memory record of what the fuzzy controller decided and why.
+
+    Every decision is folded into fixed-size histograms and counters: the
+    inputs, the strength of each rule r1-r8, which rule dominated, and the
+    shape of the aggregated output set (peak height, area, centroid). Memory
+    does not grow with the number of decisions, and instances from parallel
+    runs can be merged.
+    """
+
+    def __init__(self, bins=None):
+        bins = Config['fuzzy_instrumentation']['bins'] if bins is None else bins
+        mf = Config['fuzzy']['membership_function']
+        self.bins = bins
+        # Inputs saturate past the last breakpoint, so anything beyond it shares the last bin
+        self.input_max = float(max(max(v) for v in list(mf['arriving_green_light'].values()) +
+                                   list(mf['behind_red_light'].values())))
+        self.extension_max = float(Config['fuzzy']['range']['extension'][-1])
+
+        self.decisions = np.zeros(2, dtype=np.int64)  # by extension_count (0, 1+)
+        self.rule_fired = np.zeros(len(RULES), dtype=np.int64)
+        self.rule_dominant = np.zeros(len(RULES), dtype=np.int64)
+        self.rule_strength_sum = np.zeros(len(RULES))
+        self.rule_strength_histogram = np.zeros((len(RULES), bins), dtype=np.int64)
+        self.input_histogram = np.zeros((bins, bins), dtype=np.int64)  # arriving x behind
+        self.extension_histogram = np.zeros((2, bins), dtype=np.int64)
+        self.peak_histogram = np.zeros(bins, dtype=np.int64)
+        self.area_histogram = np.zeros(bins, dtype=np.int64)
+        self.empty_output = 0  # decisions where no output term was activated
+
+    def _bin(self, value, upper):
+        return min(max(int(value / upper * self.bins), 0), self.bins - 1)
+
+    def record(self, arriving, behind, extension_count, rules, output, extension):
+        """
+        Fold one decision in.
+        :param rules: {'r1': strength, ...} as fired by Fuzzy._fire_rules
+        :param output: Aggregated output membership over the extension universe
+        :param extension: Crisp extension that was returned
+        """
+        count = min(extension_count, 1)
+        strengths = np.array([rules[name] for name in RULES], dtype=np.float64)
+
+        self.decisions[count] += 1
+        self.rule_fired += strengths > 0
+        self.rule_strength_sum += strengths
+        bins = np.minimum((strengths * self.bins).astype(np.int64), self.bins - 1)
+        self.rule_strength_histogram[np.arange(len(RULES)), bins] += 1
+        if strengths.max() > 0:
+            self.rule_dominant[int(strengths.argmax())] += 1
+
+        self.input_histogram[self._bin(arriving, self.input_max), self._bin(behind, self.input_max)] += 1
+        self.extension_histogram[count, self._bin(extension, self.extension_max)] += 1
+
+        peak = float(np.max(output))
+        if peak == 0:
+            self.empty_output += 1
+        self.peak_histogram[self._bin(peak, 1.0)] += 1
+        # Area relative to the largest possible (every point fully activated)
+        self.area_histogram[self._bin(float(np.mean(output)), 1.0)] += 1
+
+    def merge(self, other):
+        """Add the counts of another instance, e.g. from a parallel run."""
+        for name, value in vars(other).items():
+            if isinstance(value, np.ndarray):
+                getattr(self, name).__iadd__(value)
+        self.empty_output += other.empty_output
+
+    def summary(self):
+        """Headline numbers per rule and per decision kind."""
+        total = max(int(self.decisions.sum()), 1)
+        return {
+            'decisions': int(self.decisions.sum()),
+            'first_extensions': int(self.decisions[0]),
+            'later_extensions': int(self.decisions[1]),
+            'empty_output': self.empty_output,
+            'rules': {
+                name: {
+                    'fire_rate': float(self.rule_fired[i]) / total,
+                    'dominant_rate': float(self.rule_dominant[i]) / total,
+                    'mean_strength': float(self.rule_strength_sum[i]) / total
+                }
+                for i, name in enumerate(RULES)
+            }
+        }
+
+    def export(self, path):
+        """Write every histogram and counter, with bin edges, to an .npz file."""
+        np.savez(
+            path,
+            rules=np.array(RULES),
+            decisions=self.decisions,
+            rule_fired=self.rule_fired,
+            rule_dominant=self.rule_dominant,
+            rule_strength_sum=self.rule_strength_sum,
+            rule_strength_histogram=self.rule_strength_histogram,
+            strength_edges=np.linspace(0, 1, self.bins + 1),
+            input_histogram=self.input_histogram,
+            input_edges=np.linspace(0, self.input_max, self.bins + 1),
+            extension_histogram=self.extension_histogram,
+            extension_edges=np.linspace(0, self.extension_max, self.bins + 1),
+            peak_histogram=self.peak_histogram,
+            area_histogram=self.area_histogram,
+            empty_output=np.int64(self.empty_output)
+        )
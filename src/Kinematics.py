@@ -0,0 +1,92 @@
+import numpy as np
+
+from src.Config import Config
+
+
+class IntelligentDriverModel:
+    """
+    Intelligent Driver Model car following for whole lanes at once.
+
+    Vehicles are given as arrays along the last axis, front vehicle first, so
+    each vehicle's leader is the entry before it. Accelerations are computed
+    from the state at the start of the tick and integrated with the ballistic
+    scheme (constant acceleration over the tick, never reversing), which stays
+    stable at the simulator's fixed frame time.
+    Units are pixels and seconds.
+    """
+
+    def __init__(self, cfg=None):
+        cfg = Config['vehicle']['idm'] if cfg is None else cfg
+        self.desired_speed = cfg['desired_speed']
+        self.max_acceleration = cfg['max_acceleration']
+        self.comfortable_deceleration = cfg['comfortable_deceleration']
+        self.max_deceleration = cfg['max_deceleration']
+        self.time_headway = cfg['time_headway']
+        self.minimum_gap = cfg['minimum_gap']
+        self.exponent = cfg['exponent']
+        self.dt = 1 / Config['simulator']['frame_rate']
+
+    def entry_speed(self, gap=np.inf, last_speed=None):
+        """
+        Speed of a vehicle entering `gap` behind the vehicle in front, going last_speed:
+        no faster than it, and slow enough to stop comfortably within the gap.
+        Works elementwise on arrays.
+        """
+        last_speed = self.desired_speed if last_speed is None else last_speed
+        stopping_speed = np.sqrt(2 * self.comfortable_deceleration * np.maximum(gap - self.minimum_gap, 0.0))
+        return np.minimum(np.minimum(self.desired_speed, last_speed), stopping_speed)
+
+    def _acceleration(self, speed, gap, leader_speed):
+        desired_gap = self.minimum_gap + np.maximum(
+            0.0,
+            speed * self.time_headway +
+            speed * (speed - leader_speed) / (2 * np.sqrt(self.max_acceleration * self.comfortable_deceleration))
+        )
+        gap = np.maximum(gap, 1e-3)
+        return self.max_acceleration * (
+            1 - (speed / self.desired_speed) ** self.exponent - (desired_gap / gap) ** 2
+        )
+
+    def step(self, progress, speed, vehicle_length, obstacle=np.inf):
+        """
+        Advance every vehicle by one frame.
+        :param progress: Positions along the lane, front vehicle first on the last axis
+        :param speed: Speeds, same shape
+        :param vehicle_length: Vehicle length, broadcastable against progress
+        :param obstacle: Progress at which vehicles should halt, e.g. a red light's hold position,
+        broadcastable against progress; np.inf for none. Vehicles already past it, or that
+        cannot stop before it without braking harder than max_deceleration, ignore it.
+        :return: (progress, speed, acceleration) after the frame
+        """
+        vehicle_length = np.asarray(vehicle_length, dtype=np.float64)
+        # Leader of the front vehicle is infinitely far ahead and as fast
+        leader_progress = np.concatenate([np.full(progress.shape[:-1] + (1,), np.inf), progress[..., :-1]], axis=-1)
+        leader_speed = np.concatenate([speed[..., :1], speed[..., :-1]], axis=-1)
+        acceleration = self._acceleration(speed, leader_progress - progress - vehicle_length, leader_speed)
+
+        # A stopping point acts as a standing leader whose rear is minimum_gap past it. The model
+        # overreacts to one appearing suddenly (a light turning yellow); the vehicles it keeps
+        # can stop with max_deceleration, so braking for it is capped there
+        distance = obstacle - progress
+        stops = (distance >= 0) & (speed * speed <= 2 * self.max_deceleration * distance)
+        stopping = np.maximum(self._acceleration(speed, distance + self.minimum_gap, 0.0), -self.max_deceleration)
+        acceleration = np.where(stops, np.minimum(acceleration, stopping), acceleration)
+
+        # Ballistic update; a vehicle that would reverse stops where its speed reaches zero
+        dt = self.dt
+        new_speed = speed + acceleration * dt
+        halting = new_speed < 0
+        travelled = np.where(
+            halting,
+            -speed * speed / (2 * np.where(halting, acceleration, -1.0)),
+            speed * dt + 0.5 * acceleration * dt * dt
+        )
+        new_speed = np.maximum(new_speed, 0.0)
+
+        # Never closer than bumper to bumper to the already moved leader
+        offset = vehicle_length * np.arange(progress.shape[-1])
+        new_progress = np.minimum.accumulate(progress + travelled + offset, axis=-1) - offset
+        blocked = new_progress < progress + travelled
+        if blocked.any():
+            new_speed = np.where(blocked, np.minimum(new_speed, leader_speed), new_speed)
+        return new_progress, new_speed, acceleration
@@ -0,0 +1,118 @@
+from collections import namedtuple
+
+from src.Common import Lane
+from src.Config import Config
+from src.Sprites import vehicle_size
+
+# Everything about a lane that only depends on Config, computed once.
+# Positions along the lane are 1-D "progress" values, progress = sign * getattr(vehicle, axis),
+# so larger progress is always further downstream whatever the direction of travel.
+LaneGeometry = namedtuple('LaneGeometry', [
+    'lane',
+    'axis',              # 'x' or 'y', the coordinate that changes while driving
+    'lateral_axis',      # the other coordinate, fixed for the whole lane
+    'sign',              # +1 or -1, direction of travel along axis
+    'direction',         # unit direction vector (dx, dy)
+    'vehicle_size',      # on-screen (width, height) of a vehicle
+    'vehicle_length',    # vehicle extent along axis
+    'vehicle_breadth',   # vehicle extent along lateral_axis
+    'step',              # progress per frame at constant speed
+    'follow_distance',   # closest progress behind the vehicle in front, rear to rear or front to front
+    'spawn',             # (x, y) where new vehicles enter
+    'max_position',      # largest (x, y) of a vehicle still inside the world
+    'spawn_progress',
+    'lateral',           # lateral coordinate shared by every vehicle of the lane
+    'stop_progress',     # largest progress still counting as behind the stop line
+    'hold_progress',     # progress at which a vehicle waits for the light
+    'light',             # (x, y) of the traffic light
+    'countdown_offset'   # (dx, dy) from the traffic light to its countdown label
+])
+
+
+def build_lane_geometry():
+    """Precompute the geometry of every lane from Config: {Lane: LaneGeometry}."""
+    world_width = Config['world']['width']
+    world_height = Config['world']['height']
+    bumper_distance = Config['simulator']['bumper_distance']
+    body_width = Config['vehicle']['body_width']
+    body_length = Config['vehicle']['body_length']
+    speed = Config['vehicle']['speed']
+    safe_distance = Config['vehicle']['safe_distance']
+
+    cfg = Config['traffic_light']
+    light_width = cfg['body_width']
+    light_height = cfg['body_height']
+    offset = cfg['distance_from_center']
+
+    lights = {
+        Lane.left_to_right: (
+            world_width / 2 - offset[0] - light_width,
+            world_height / 2 - offset[1] - light_height
+        ),
+        Lane.right_to_left: (
+            world_width / 2 + offset[0],
+            world_height / 2 + offset[1]
+        ),
+        Lane.top_to_bottom: (
+            world_width / 2 + offset[1],
+            world_height / 2 - offset[0] - light_width
+        ),
+        Lane.bottom_to_top: (
+            world_width / 2 - offset[1] - light_height,
+            world_height / 2 + offset[0]
+        )
+    }
+    spawns = {
+        Lane.left_to_right: (0, world_height / 2 - body_width - bumper_distance),
+        Lane.right_to_left: (world_width - body_length, world_height / 2 + bumper_distance),
+        Lane.top_to_bottom: (world_width / 2 + bumper_distance, 0),
+        Lane.bottom_to_top: (world_width / 2 - body_width - bumper_distance, world_height - body_length)
+    }
+
+    geometry = {}
+    for lane in Lane:
+        width, height = vehicle_size(lane)
+        light_x, light_y = lights[lane]
+        spawn_x, spawn_y = spawns[lane]
+
+        if lane == Lane.left_to_right:
+            stop = light_x + light_width - width
+            hold = light_x - light_width / 2 - width
+            countdown = (0, -light_height)
+        elif lane == Lane.right_to_left:
+            stop = -(light_x + light_width)
+            hold = -(light_x + light_width * 1.5)
+            countdown = (0, light_height * 1.25)
+        elif lane == Lane.top_to_bottom:
+            stop = light_y - height
+            hold = light_y - light_height / 2 - height
+            countdown = (light_width * 2, 0)
+        else:
+            stop = -(light_y + light_height)
+            hold = -(light_y + light_height)
+            countdown = (-light_width * 2, 0)
+
+        sign = 1 if lane in [Lane.left_to_right, Lane.top_to_bottom] else -1
+        horizontal = lane in [Lane.left_to_right, Lane.right_to_left]
+        vehicle_length = width if horizontal else height
+        geometry[lane] = LaneGeometry(
+            lane=lane,
+            axis='x' if horizontal else 'y',
+            lateral_axis='y' if horizontal else 'x',
+            sign=sign,
+            direction=(sign, 0) if horizontal else (0, sign),
+            vehicle_size=(width, height),
+            vehicle_length=vehicle_length,
+            vehicle_breadth=height if horizontal else width,
+            step=speed,
+            follow_distance=safe_distance + vehicle_length,
+            spawn=(spawn_x, spawn_y),
+            max_position=(world_width - width, world_height - height),
+            spawn_progress=sign * (spawn_x if horizontal else spawn_y),
+            lateral=spawn_y if horizontal else spawn_x,
+            stop_progress=stop,
+            hold_progress=hold,
+            light=(light_x, light_y),
+            countdown_offset=countdown
+        )
+    return geometry
@@ -0,0 +1,46 @@
+import bisect
+
+
+class LaneIndex:
+    """
+    Ordered index of vehicle positions along a single lane.
+
+    Keys are the negated longitudinal progress of each vehicle, kept in the
+    same order as the lane's vehicle list (front of the queue first), so the
+    list is always ascending and queue queries reduce to a bisect.
+    """
+
+    def __init__(self):
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def append(self, progress):
+        """Register a vehicle spawned at the back of the lane."""
+        self.keys.append(-progress)
+
+    def update(self, i, progress):
+        """Move the i-th vehicle; vehicles never overtake, so order is preserved."""
+        self.keys[i] = -progress
+
+    def rebuild(self, progresses):
+        """Rebuild the index after vehicles have left the lane."""
+        self.keys = [-p for p in progresses]
+
+    def first_behind(self, stop_progress):
+        """Index of the first vehicle that has not yet passed the stop line."""
+        return bisect.bisect_left(self.keys, -stop_progress)
+
+    def count_behind(self, stop_progress):
+        """Number of vehicles queued behind the stop line."""
+        return len(self.keys) - self.first_behind(stop_progress)
+
+    def last_past(self, stop_progress):
+        """Index of the vehicle that most recently passed the stop line, or None."""
+        i = self.first_behind(stop_progress)
+        return i - 1 if i > 0 else None
+
+    def range(self, lo, hi):
+        """Slice bounds [i, j) of the vehicles whose progress lies within [lo, hi]."""
+        return bisect.bisect_left(self.keys, -hi), bisect.bisect_right(self.keys, -lo)
@@ -0,0 +1,162 @@
+import argparse
+import multiprocessing
+import os
+import numpy as np
+
+from src.Common import Lane
+from src.Clock import clock
+from src.Config import Config
+from src.SharedState import FRAME_DTYPE, MAX_VEHICLES, fill_hud, apply_frame
+
+# Per-frame light states and HUD statistics, plus where the frame's vehicles start
+HUD_DTYPE = np.dtype(
+    [(name, FRAME_DTYPE.fields[name][0]) for name in FRAME_DTYPE.names if not name.startswith('vehicle_')] +
+    [('vehicle_offset', np.int64)]
+)
+
+VEHICLE_DTYPE = np.dtype([
+    ('x', np.float32),
+    ('y', np.float32),
+    ('lane', np.int8),
+    ('image', np.int16)
+])
+
+
+class RunRecorder:
+    """
+    Records everything needed to redraw a run, one entry per frame.
+    Vehicles of all frames are concatenated into one array so a recording
+    only grows with the vehicles actually on the road.
+    """
+
+    def __init__(self):
+        self.huds = []
+        self.vehicles = []
+        self.num_vehicles = 0
+
+    def record(self, simulator):
+        hud = np.zeros((), dtype=HUD_DTYPE)
+        fill_hud(hud, simulator)
+        hud['vehicle_offset'] = self.num_vehicles
+        self.huds.append(hud)
+
+        rows = [(v.x, v.y, lane.value, v.image_index)
+                for lane in Lane for v in simulator.vehicle_ctrl.get_vehicles(lane)]
+        self.vehicles.append(np.array(rows, dtype=VEHICLE_DTYPE))
+        self.num_vehicles += len(rows)
+
+    def save(self, path):
+        """Write the recording as a directory of .npy files that can be memory-mapped."""
+        os.makedirs(path, exist_ok=True)
+        huds = np.array(self.huds, dtype=HUD_DTYPE)
+        vehicles = np.concatenate(self.vehicles) if self.vehicles else np.zeros(0, dtype=VEHICLE_DTYPE)
+        np.save(os.path.join(path, 'frames.npy'), huds)
+        np.save(os.path.join(path, 'vehicles.npy'), vehicles)
+
+
+def load_recording(path):
+    """Memory-map a saved recording: (per-frame HUD records, concatenated vehicles)."""
+    huds = np.load(os.path.join(path, 'frames.npy'), mmap_mode='r')
+    vehicles = np.load(os.path.join(path, 'vehicles.npy'), mmap_mode='r')
+    return huds, vehicles
+
+
+def to_frame(huds, vehicles, i):
+    """Rebuild the i-th recorded frame in the shared-memory frame layout."""
+    frame = np.zeros((), dtype=FRAME_DTYPE)
+    for name in HUD_DTYPE.names:
+        if name != 'vehicle_offset':
+            frame[name] = huds[i][name]
+
+    start = int(huds[i]['vehicle_offset'])
+    stop = int(huds[i + 1]['vehicle_offset']) if i + 1 < len(huds) else len(vehicles)
+    rows = vehicles[start:min(stop, start + MAX_VEHICLES)]
+    n = len(rows)
+    frame['num_vehicles'] = n
+    frame['vehicle_x'][:n] = rows['x']
+    frame['vehicle_y'][:n] = rows['y']
+    frame['vehicle_lane'][:n] = rows['lane']
+    frame['vehicle_image'][:n] = rows['image']
+    return frame
+
+
+def record_headless(path, seconds):
+    """Run a headless simulation in simulated time and save its recording."""
+    from src.Simulator import Simulator
+
+    clock.use_simulated()
+    simulator = Simulator('record', headless=True)
+    recorder = RunRecorder()
+    simulator.initialize()
+    for _ in range(int(seconds * Config['simulator']['frame_rate'])):
+        simulator.step()
+        recorder.record(simulator)
+    recorder.save(path)
+
+
+def _render_range(run_path, out_path, start, stop, fmt):
+    """Pool worker: draw frames [start, stop) of a recording offscreen."""
+    import pygame
+    from src.Simulator import Simulator
+
+    pygame.font.init()
+    surface = pygame.Surface((Config['simulator']['screen_width'], Config['simulator']['screen_height']))
+    simulator = Simulator('render', surface=surface)
+    huds, vehicles = load_recording(run_path)
+
+    batch = None
+    if fmt == 'npy':
+        batch = np.empty((stop - start, surface.get_height(), surface.get_width(), 3), dtype=np.uint8)
+    for i in range(start, stop):
+        frame = to_frame(huds, vehicles, i)
+        apply_frame(simulator, frame)
+        simulator.draw_frame(frame)
+        if fmt == 'png':
+            pygame.image.save(surface, os.path.join(out_path, f'frame_{i:06d}.png'))
+        else:
+            batch[i - start] = pygame.surfarray.pixels3d(surface).transpose(1, 0, 2)
+
+    if fmt == 'npy':
+        np.save(os.path.join(out_path, f'frames_{start:06d}.npy'), batch)
+    return stop - start
+
+
+def render_recording(run_path, out_path, fmt='png', batch_size=100, processes=None):
+    """
+    Render a recording to numbered PNGs or (frames, height, width, 3) uint8 .npy
+    batches, splitting the frame range across a process pool.
+    :return: Number of frames rendered
+    """
+    if fmt not in ['png', 'npy']:
+        raise ValueError(f'Unknown frame format: {fmt}')
+    os.makedirs(out_path, exist_ok=True)
+    num_frames = len(load_recording(run_path)[0])
+    ranges = [(run_path, out_path, start, min(start + batch_size, num_frames), fmt)
+              for start in range(0, num_frames, batch_size)]
+
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes) as pool:
+        return sum(pool.starmap(_render_range, ranges))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Record runs and render them offscreen')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='record a headless run in simulated time')
+    record_parser.add_argument('run', help='directory to write the recording to')
+    record_parser.add_argument('--seconds', type=float, default=60, help='simulated duration')
+
+    render_parser = commands.add_parser('render', help='render a recording to image files')
+    render_parser.add_argument('run', help='recording directory')
+    render_parser.add_argument('out', help='directory for the rendered frames')
+    render_parser.add_argument('--format', choices=['png', 'npy'], default='png')
+    render_parser.add_argument('--batch-size', type=int, default=100, help='frames per pool task and .npy file')
+    render_parser.add_argument('--processes', type=int, default=None)
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record_headless(args.run, args.seconds)
+    else:
+        count = render_recording(args.run, args.out, args.format, args.batch_size, args.processes)
+        print(f'Rendered {count} frames into {args.out}')
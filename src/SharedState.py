@@ -0,0 +1,170 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+from src.Common import Lane, TrafficStatus, DoubleLane
+from src.Clock import clock
+from src.Config import Config
+
+MAX_VEHICLES = Config['simulator']['max_shared_vehicles']
+
+# One published frame: everything the renderer needs to draw a tick
+FRAME_DTYPE = np.dtype([
+    ('num_vehicles', np.int32),
+    ('vehicle_x', np.float32, (MAX_VEHICLES,)),
+    ('vehicle_y', np.float32, (MAX_VEHICLES,)),
+    ('vehicle_lane', np.int8, (MAX_VEHICLES,)),
+    ('vehicle_image', np.int16, (MAX_VEHICLES,)),
+    ('light_status', np.int8, (len(Lane),)),
+    ('light_remaining', np.float32, (len(Lane),)),
+    ('counter', np.int64),
+    ('moving_averages', np.float32, (len(Lane),)),
+    ('green_light_extension', np.float32),
+    ('extension_horizontal', np.float32),
+    ('extension_vertical', np.float32),
+    ('extension_age', np.float32)
+])
+
+# seq: number of frames published, front: buffer holding the latest frame, running: cleared to stop the worker
+HEADER_DTYPE = np.dtype([
+    ('seq', np.int64),
+    ('front', np.int64),
+    ('running', np.int64)
+])
+
+
+class SharedState:
+    """
+    Double-buffered simulation frame in a multiprocessing.shared_memory block.
+
+    The simulation process writes into the back buffer and then flips `front`;
+    the render process copies the front buffer and retries if `seq` moved
+    while it was copying.
+    """
+
+    def __init__(self, name=None):
+        size = HEADER_DTYPE.itemsize + 2 * FRAME_DTYPE.itemsize
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        self.frames = np.ndarray((2,), dtype=FRAME_DTYPE, buffer=self.shm.buf, offset=HEADER_DTYPE.itemsize)
+
+        if self.owner:
+            self.header['seq'] = 0
+            self.header['front'] = 0
+            self.header['running'] = 1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def running(self):
+        return bool(self.header['running'])
+
+    def request_stop(self):
+        self.header['running'] = 0
+
+    def publish(self, simulator):
+        """Write the simulator state into the back buffer and make it the front one."""
+        back = 1 - int(self.header['front'])
+        frame = self.frames[back]
+
+        i = 0
+        for lane in Lane:
+            for vehicle in simulator.vehicle_ctrl.get_vehicles(lane):
+                if i == MAX_VEHICLES:
+                    break
+                frame['vehicle_x'][i] = vehicle.x
+                frame['vehicle_y'][i] = vehicle.y
+                frame['vehicle_lane'][i] = lane.value
+                frame['vehicle_image'][i] = vehicle.image_index
+                i += 1
+        frame['num_vehicles'] = i
+
+        fill_hud(frame, simulator)
+
+        self.header['front'] = back
+        self.header['seq'] += 1
+
+    def read(self):
+        """Return a private copy of the latest complete frame and its sequence number."""
+        while True:
+            seq = int(self.header['seq'])
+            frame = self.frames[int(self.header['front'])].copy()
+            # The writer only starts on the buffer we copied after bumping seq again
+            if int(self.header['seq']) == seq:
+                return frame, seq
+
+    def close(self):
+        del self.header, self.frames
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def fill_hud(frame, simulator):
+    """Write light states and HUD statistics into a frame record."""
+    for lane, light in simulator.traffic_ctrl.traffic_lights.items():
+        frame['light_status'][lane.value - 1] = light.status.value
+        frame['light_remaining'][lane.value - 1] = light.get_green_light_remaining_time()
+        frame['moving_averages'][lane.value - 1] = simulator.moving_averages[lane]
+
+    frame['counter'] = simulator.vehicle_ctrl.counter
+    frame['green_light_extension'] = simulator.traffic_ctrl.get_green_light_extension()
+    frame['extension_horizontal'] = simulator.horizontal
+    frame['extension_vertical'] = simulator.vertical
+    frame['extension_age'] = clock.now() - simulator.extension_notification_start_time
+
+
+def apply_frame(simulator, frame):
+    """Mirror a published frame onto the render process's traffic lights and HUD state."""
+    for lane, light in simulator.traffic_ctrl.traffic_lights.items():
+        light.status = TrafficStatus(int(frame['light_status'][lane.value - 1]))
+    simulator.moving_averages = {lane: float(frame['moving_averages'][lane.value - 1]) for lane in Lane}
+    simulator.horizontal = float(frame['extension_horizontal'])
+    simulator.vertical = float(frame['extension_vertical'])
+
+
+def run_simulation_worker(shm_name, commands, ring_path=None, record_path=None):
+    """
+    Entry point of the simulation process: step the model at the frame rate and
+    publish every tick until the renderer clears the running flag.
+    :param shm_name: Name of the shared memory block created by the renderer
+    :param commands: Queue of (DoubleLane value, spawn rate) changes from the UI
+    :param ring_path: Telemetry ring file to publish to, if any
+    :param record_path: Directory to save a recording of the run to on exit, if any
+    """
+    import pygame
+    from src.Simulator import Simulator
+
+    state = SharedState(shm_name)
+    simulator = Simulator('worker', headless=True, ring_path=ring_path, record_path=record_path)
+    clock = pygame.time.Clock()
+
+    simulator.initialize()
+    try:
+        while state.running:
+            while not commands.empty():
+                double_lane, rate = commands.get_nowait()
+                simulator.background_ctrl.set_spawn_rate(DoubleLane(double_lane), rate)
+
+            simulator.step()
+            if simulator.recorder is not None:
+                simulator.recorder.record(simulator)
+            state.publish(simulator)
+            clock.tick(Config['simulator']['frame_rate'])
+    finally:
+        if simulator.recorder is not None:
+            simulator.recorder.save(record_path)
+        if simulator.telemetry_ring is not None:
+            simulator.telemetry_ring.close()
+        if simulator.decision_pipeline is not None:
+            simulator.decision_pipeline.close()
+        instrumentation = simulator.traffic_ctrl.fuzzy.instrumentation
+        if instrumentation is not None and Config['fuzzy_instrumentation']['export_path'] is not None:
+            instrumentation.export(Config['fuzzy_instrumentation']['export_path'])
+        state.close()
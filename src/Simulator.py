@@ -1,24 +1,48 @@
+import multiprocessing
 import pygame
-import time
 
+from src.Camera import Camera
 from src.Common import Lane, DoubleLane
+from src.Clock import clock
 from src.Config import Config
 from src.Controller.VehicleController import VehicleController
 from src.Controller.TrafficController import TrafficController
 from src.Controller.BackgroundController import BackgroundController
+from src.Controller.ContinuousController import ContinuousController
+from src.DecisionPipeline import DecisionPipeline
+from src.Demand import ArrivalSchedule
+from src.Detectors import LoopDetectors
 
 
 class Simulator:
-    def __init__(self, caption):
+    def __init__(self, caption, headless=False, multiprocess=False, surface=None, record_path=None,
+                 ring_path=None):
+        """
+        :param caption: Window caption
+        :param headless: Run the model only, without opening a window or drawing
+        :param multiprocess: Run the model in a worker process and only draw here
+        :param surface: Draw onto this surface instead of opening a window
+        :param record_path: Save a recording of the run to this directory on exit
+        :param ring_path: Publish per-tick telemetry records to this memory-mapped ring file
+        """
         self.caption = caption
-        self.surface = pygame.display.set_mode((
-            Config['simulator']['screen_width'],
-            Config['simulator']['screen_height']
-        ))
+        self.headless = headless
+        self.multiprocess = multiprocess
+        self.surface = surface
+        self.camera = None
+        if not headless:
+            self.camera = Camera()
+        if not headless and surface is None:
+            self.surface = pygame.display.set_mode((
+                Config['simulator']['screen_width'],
+                Config['simulator']['screen_height']
+            ))
 
         # Core controllers
         self.vehicle_ctrl = VehicleController(self.surface)
         self.traffic_ctrl = TrafficController(self.surface)
+        if Config['detectors']['enabled']:
+            self.vehicle_ctrl.detectors = LoopDetectors(self.traffic_ctrl.geometry)
         self.background_ctrl = BackgroundController(
             self.surface,
             self.traffic_ctrl.get_traffic_lights(DoubleLane.Horizontal) +
@@ -26,32 +50,78 @@ class Simulator:
         )
 
         self.clock = pygame.time.Clock()
-        self.start_time = time.time()
-        self.extension_notification_start_time = time.time() - 10
+        self.start_time = clock.now()
+        self.extension_notification_start_time = clock.now() - 10
 
         # Traffic flow and spawn rate control
         self.green_light_remaining_time = Config['traffic_light']['green_light_duration']
-        self.moving_averages = self.vehicle_ctrl.get_moving_averages_num_vehicles_behind_traffic()
+        self.moving_averages = self.vehicle_ctrl.get_fuzzy_inputs()
         self.is_extended = False
         self.horizontal = 0
         self.vertical = 0
+        self.extended_green_start_time = None  # start of the green phase the extension belongs to
 
-        self.HORIZONTAL_SPAWN_EVENT = pygame.USEREVENT + 1
-        self.VERTICAL_SPAWN_EVENT = pygame.USEREVENT + 2
+        self.next_spawn_time = {DoubleLane.Horizontal: 0, DoubleLane.Vertical: 0}
+        self.arrivals = None
+        if Config['demand']['arrivals'] != 'intervals':
+            self.arrivals = ArrivalSchedule(self.start_time)
+
+        self.continuous_ctrl = None
+        if Config['simulator']['control_mode'] == 'continuous':
+            self.continuous_ctrl = ContinuousController(self.traffic_ctrl, self.vehicle_ctrl)
+        self.decision_pipeline = None
+        # In multiprocess mode only the simulation worker steps and decides
+        if Config['decision_pipeline']['enabled'] and not multiprocess:
+            self.decision_pipeline = DecisionPipeline(self.traffic_ctrl.fuzzy)
+
+        self.record_path = record_path
+        self.recorder = None
+        # In multiprocess mode the simulation worker records; this process only draws
+        if record_path is not None and not multiprocess:
+            from src.Recording import RunRecorder
+            self.recorder = RunRecorder()
+
+        self.ring_path = ring_path
+        self.telemetry_ring = None
+        if ring_path is not None and not multiprocess:
+            from src.TelemetryRing import TelemetryRing
+            self.telemetry_ring = TelemetryRing(ring_path)
+
+        # Multiprocess mode only
+        self.shared_state = None
+        self.commands = None
 
     def start(self):
         """Start the simulator loop."""
         pygame.init()
         pygame.display.set_caption(self.caption)
-        self.initialize()
-        self.main_loop()
+        if self.multiprocess:
+            self.main_loop_multiprocess()
+        else:
+            self.initialize()
+            self.main_loop()
+        if self.recorder is not None:
+            self.recorder.save(self.record_path)
+        if self.telemetry_ring is not None:
+            self.telemetry_ring.close()
+        if self.decision_pipeline is not None:
+            self.decision_pipeline.close()
+        instrumentation = self.traffic_ctrl.fuzzy.instrumentation
+        # In multiprocess mode the simulation worker takes the decisions and exports them
+        if instrumentation is not None and Config['fuzzy_instrumentation']['export_path'] is not None \
+                and not self.multiprocess:
+            instrumentation.export(Config['fuzzy_instrumentation']['export_path'])
         pygame.quit()
         quit()
 
     def initialize(self):
         """Initial setup before main loop starts."""
+        if self.arrivals is not None:
+            return  # the schedule decides when the first vehicles arrive
         self.spawn(DoubleLane.Horizontal)
         self.spawn(DoubleLane.Vertical)
+        for double_lane in self.next_spawn_time:
+            self.next_spawn_time[double_lane] = clock.now() + Config['simulator']['spawn_rate']['slow'] / 1000
 
     def spawn(self, double_lane: DoubleLane):
         """Spawn two vehicles in opposing lanes."""
@@ -66,23 +136,41 @@ class Simulator:
         """Spawn a single vehicle for a specific lane."""
         self.vehicle_ctrl.create_vehicle(lane, self.traffic_ctrl.traffic_lights[lane])
 
-    def calculate_fuzzy_score(self, moving_averages):
-        """Call fuzzy controller and return crisp extension."""
-        lane = self.traffic_ctrl.get_current_active_lane()
-        ext_count = 1 if self.is_extended else 0
+    def update_spawns(self):
+        """Spawn vehicles on each double lane whose spawn interval has elapsed."""
+        now = clock.now()
+        if self.arrivals is not None:
+            self.update_scheduled_spawns(now)
+            return
+        for double_lane, next_time in self.next_spawn_time.items():
+            if now >= next_time:
+                rate = self.background_ctrl.get_spawn_rate(double_lane)
+                self.next_spawn_time[double_lane] = now + Config['simulator']['spawn_rate'][rate] / 1000
+                self.spawn(double_lane)
+
+    def update_scheduled_spawns(self, now):
+        """Let in at most one due arrival per lane; blocked arrivals wait at the entry."""
+        if now >= self.arrivals.end:
+            self.arrivals.extend()
+        for lane in Lane:
+            if self.arrivals.due(lane, now) > 0 and \
+                    self.vehicle_ctrl.create_vehicle(lane, self.traffic_ctrl.traffic_lights[lane]) is not None:
+                self.arrivals.pop(lane)
 
+    def get_fuzzy_arguments(self, moving_averages):
+        """(arriving, behind) fuzzy inputs for the active double lane, or None in transition."""
+        lane = self.traffic_ctrl.get_current_active_lane()
         if lane == DoubleLane.Vertical:
-            return self.traffic_ctrl.calculate_fuzzy_score(
-                moving_averages[Lane.top_to_bottom],
-                moving_averages[Lane.left_to_right],
-                ext_count
-            )
+            return moving_averages[Lane.top_to_bottom], moving_averages[Lane.left_to_right]
         elif lane == DoubleLane.Horizontal:
-            return self.traffic_ctrl.calculate_fuzzy_score(
-                moving_averages[Lane.left_to_right],
-                moving_averages[Lane.top_to_bottom],
-                ext_count
-            )
+            return moving_averages[Lane.left_to_right], moving_averages[Lane.top_to_bottom]
+
+    def calculate_fuzzy_score(self, moving_averages):
+        """Call fuzzy controller and return crisp extension."""
+        arguments = self.get_fuzzy_arguments(moving_averages)
+        ext_count = 1 if self.is_extended else 0
+        if arguments is not None:
+            return self.traffic_ctrl.calculate_fuzzy_score(*arguments, ext_count)
 
     def handle_events(self):
         """React to user or system-generated events."""
@@ -90,80 +178,180 @@ class Simulator:
             if event.type == pygame.QUIT:
                 return True  # signal to exit
 
-            if event.type == self.HORIZONTAL_SPAWN_EVENT:
-                rate = self.background_ctrl.get_spawn_rate(DoubleLane.Horizontal)
-                pygame.time.set_timer(self.HORIZONTAL_SPAWN_EVENT, Config['simulator']['spawn_rate'][rate])
-                self.spawn(DoubleLane.Horizontal)
-
-            if event.type == self.VERTICAL_SPAWN_EVENT:
-                rate = self.background_ctrl.get_spawn_rate(DoubleLane.Vertical)
-                pygame.time.set_timer(self.VERTICAL_SPAWN_EVENT, Config['simulator']['spawn_rate'][rate])
-                self.spawn(DoubleLane.Vertical)
+            # Mouse wheel zooms the camera
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
+                step = Config['camera']['zoom_step']
+                self.camera.zoom_at(step if event.button == 4 else 1 / step, event.pos)
 
-            if event.type == pygame.MOUSEBUTTONDOWN:
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 for dl in [DoubleLane.Horizontal, DoubleLane.Vertical]:
                     for rate in ['slow', 'medium', 'fast']:
-                        if self.background_ctrl.spawn_rate_buttons[dl][rate].collidepoint(event.pos):
+                        button = self.background_ctrl.spawn_rate_buttons[dl][rate]
+                        if button and button.collidepoint(event.pos):
                             self.background_ctrl.set_spawn_rate(dl, rate)
+                            if self.commands is not None:
+                                self.commands.put((dl.value, rate))
 
+        self.camera.handle_keys(pygame.key.get_pressed())
         return False
 
     def main_loop(self):
         """Main simulation loop."""
         game_over = False
 
-        pygame.time.set_timer(self.HORIZONTAL_SPAWN_EVENT, Config['simulator']['spawn_rate']['slow'])
-        pygame.time.set_timer(self.VERTICAL_SPAWN_EVENT, Config['simulator']['spawn_rate']['slow'])
-
         while not game_over:
             game_over = self.handle_events()
 
-            self.update_controllers()
+            self.step()
+            if self.recorder is not None:
+                self.recorder.record(self)
             self.draw_ui()
 
             pygame.display.update()
             self.clock.tick(Config['simulator']['frame_rate'])
 
+    def main_loop_multiprocess(self):
+        """Draw frames published by a simulation worker process until the window closes."""
+        from src.SharedState import SharedState, apply_frame, run_simulation_worker
+
+        ctx = multiprocessing.get_context('spawn')
+        self.shared_state = SharedState()
+        self.commands = ctx.Queue()
+        worker = ctx.Process(target=run_simulation_worker,
+                             args=(self.shared_state.name, self.commands, self.ring_path, self.record_path),
+                             daemon=True)
+        worker.start()
+
+        game_over = False
+        last_seq = 0  # nothing published yet
+        try:
+            while not game_over and worker.is_alive():
+                game_over = self.handle_events()
+
+                frame, seq = self.shared_state.read()
+                if seq != last_seq:
+                    last_seq = seq
+                    apply_frame(self, frame)
+                    self.draw_frame(frame)
+                    pygame.display.update()
+                self.clock.tick(Config['simulator']['frame_rate'])
+        finally:
+            self.shared_state.request_stop()
+            # The worker saves its recording before exiting, which can take a while
+            worker.join(timeout=5 if self.record_path is None else None)
+            self.shared_state.close()
+
+    def step(self):
+        """Advance the simulation by one frame without drawing."""
+        self.update_spawns()
+        self.update_controllers()
+        if self.telemetry_ring is not None:
+            self.telemetry_ring.publish(self)
+        clock.advance()
+
     def update_controllers(self):
         """Update state of simulation components."""
-        self.traffic_ctrl.update_and_draw_traffic_lights()
+        self.traffic_ctrl.update_traffic_lights()
         self.vehicle_ctrl.destroy_vehicles_outside_canvas()
-        self.vehicle_ctrl.update_and_draw_vehicles()
+        self.vehicle_ctrl.update_vehicles()
         self.vehicle_ctrl.update_num_vehicles_behind_traffic()
 
         # Update moving average every second
-        if round((time.time() - self.start_time), 1) % Config['simulator']['static_duration'] == 0:
-            self.moving_averages = self.vehicle_ctrl.get_moving_averages_num_vehicles_behind_traffic()
+        if round((clock.now() - self.start_time), 1) % Config['simulator']['static_duration'] == 0:
+            self.moving_averages = self.vehicle_ctrl.get_fuzzy_inputs()
 
         # Check for fuzzy green light extension
         current_green_time = self.traffic_ctrl.get_green_light_remaining()
-        direction_changed = current_green_time > self.green_light_remaining_time
         self.green_light_remaining_time = current_green_time
 
-        if not self.is_extended:
-            if current_green_time <= Config['simulator']['seconds_before_extension']:
-                fuzzy_score = self.calculate_fuzzy_score(self.moving_averages)
+        if Config['simulator']['control_mode'] == 'fixed':
+            return  # plain traffic light durations
+        if self.continuous_ctrl is not None:
+            self.update_continuous_extension()
+        elif not self.is_extended:
+            if self.decision_pipeline is not None:
+                self.submit_fuzzy_decision(current_green_time)
+            if current_green_time <= Config['simulator']['seconds_before_extension'] and \
+                    not self.traffic_ctrl.in_transition():
+                if self.decision_pipeline is not None:
+                    fuzzy_score = self.decision_pipeline.collect(self.traffic_ctrl.get_green_light_start_time())
+                else:
+                    fuzzy_score = self.calculate_fuzzy_score(self.moving_averages)
                 self.horizontal = self.moving_averages[Lane.left_to_right]
                 self.vertical = self.moving_averages[Lane.top_to_bottom]
                 self.traffic_ctrl.set_green_light_extension(fuzzy_score)
-                self.extension_notification_start_time = time.time()
+                self.extension_notification_start_time = clock.now()
+                self.extended_green_start_time = self.traffic_ctrl.get_green_light_start_time()
                 self.is_extended = True
-        elif direction_changed:
+        elif self.traffic_ctrl.get_green_light_start_time() != self.extended_green_start_time:
+            # The extended green is over; the next one gets its own decision
             self.traffic_ctrl.clear_all_green_light_extension()
             self.is_extended = False
 
+    def submit_fuzzy_decision(self, current_green_time):
+        """Hand the phase-end decision to the pipeline once the green is within its lead time."""
+        green_start_time = self.traffic_ctrl.get_green_light_start_time()
+        lead_time = Config['simulator']['seconds_before_extension'] + self.decision_pipeline.lead_time
+        if green_start_time is None or current_green_time > lead_time or \
+                self.decision_pipeline.is_pending(green_start_time):
+            return
+        self.decision_pipeline.submit(green_start_time, *self.get_fuzzy_arguments(self.moving_averages), 0)
+
+    def update_continuous_extension(self):
+        """Continuous control mode: let the fuzzy extension follow the queues during green."""
+        extension = self.continuous_ctrl.update()
+        if extension is not None:
+            self.horizontal = self.moving_averages[Lane.left_to_right]
+            self.vertical = self.moving_averages[Lane.top_to_bottom]
+            self.extension_notification_start_time = clock.now()
+            self.is_extended = extension > 0
+
     def draw_ui(self):
         """Render UI components and visual indicators."""
         self.background_ctrl.refresh_screen()
-        self.background_ctrl.draw_road_markings()
+        self.background_ctrl.draw_road_markings(self.camera)
+        self.traffic_ctrl.draw_traffic_lights(self.camera)
+        self.vehicle_ctrl.draw_vehicles(self.camera)
         self.background_ctrl.draw_vehicle_count(self.vehicle_ctrl.counter)
         self.background_ctrl.draw_spawn_rate_buttons()
         self.background_ctrl.draw_light_durations(self.traffic_ctrl.get_green_light_extension())
         self.background_ctrl.draw_moving_averages(self.moving_averages)
 
-        if time.time() - self.extension_notification_start_time < Config['simulator']['fuzzy_notification_duration']:
+        if clock.now() - self.extension_notification_start_time < Config['simulator']['fuzzy_notification_duration']:
             self.background_ctrl.draw_extension_notification(
                 self.traffic_ctrl.get_green_light_extension(),
                 self.horizontal,
                 self.vertical
             )
+
+    def draw_frame(self, frame):
+        """Render a frame published by the simulation worker."""
+        extension = float(frame['green_light_extension'])
+
+        self.background_ctrl.refresh_screen()
+        self.background_ctrl.draw_road_markings(self.camera)
+        self.traffic_ctrl.draw_traffic_lights(self.camera, {
+            lane: float(frame['light_remaining'][lane.value - 1]) for lane in Lane
+        })
+
+        # Cull the published vehicles against the view in one array comparison
+        n = int(frame['num_vehicles'])
+        xs, ys = frame['vehicle_x'][:n], frame['vehicle_y'][:n]
+        left, top, width, height = self.camera.visible_rect()
+        margin = Config['vehicle']['body_length']
+        visible = (xs >= left - margin) & (xs <= left + width) & (ys >= top - margin) & (ys <= top + height)
+        for i in visible.nonzero()[0]:
+            self.vehicle_ctrl.draw_vehicle_at(
+                Lane(int(frame['vehicle_lane'][i])),
+                int(frame['vehicle_image'][i]),
+                float(xs[i]),
+                float(ys[i]),
+                self.camera
+            )
+        self.background_ctrl.draw_vehicle_count(int(frame['counter']))
+        self.background_ctrl.draw_spawn_rate_buttons()
+        self.background_ctrl.draw_light_durations(extension)
+        self.background_ctrl.draw_moving_averages(self.moving_averages)
+
+        if frame['extension_age'] < Config['simulator']['fuzzy_notification_duration']:
+            self.background_ctrl.draw_extension_notification(extension, self.horizontal, self.vertical)
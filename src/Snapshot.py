@@ -0,0 +1,245 @@
+import copy
+import io
+import multiprocessing
+import random
+import numpy as np
+
+from src.Common import Lane, TrafficStatus, DoubleLane
+from src.Clock import clock
+from src.Config import Config
+from src.Entity.Vehicle import Vehicle
+
+RATES = ['slow', 'medium', 'fast']
+
+
+def take_snapshot(simulator):
+    """
+    Serialize the full simulation state to compact bytes.
+    Timestamps are stored as read from the clock; restore_snapshot shifts
+    them so that the restored run continues from the same phase.
+    """
+    vehicle_ctrl = simulator.vehicle_ctrl
+    lights = [simulator.traffic_ctrl.traffic_lights[lane] for lane in Lane]
+    vehicles = [(lane, v) for lane in Lane for v in vehicle_ctrl.get_vehicles(lane)]
+
+    window_len = vehicle_ctrl.frame_rate * vehicle_ctrl.moving_window
+    queue_window = np.zeros((len(Lane), window_len), dtype=np.int32)
+    queue_window_len = np.zeros(len(Lane), dtype=np.int32)
+    for lane in Lane:
+        window = vehicle_ctrl.num_vehicles_behind_traffic[lane]
+        queue_window[lane.value - 1, :len(window)] = list(window)
+        queue_window_len[lane.value - 1] = len(window)
+
+    rng_version, rng_state, rng_gauss = random.getstate()
+
+    arrays = {
+        'time': np.float64(clock.now()),
+        'vehicle_lane': np.array([lane.value for lane, _ in vehicles], dtype=np.int8),
+        'vehicle_x': np.array([v.x for _, v in vehicles], dtype=np.float64),
+        'vehicle_y': np.array([v.y for _, v in vehicles], dtype=np.float64),
+        'vehicle_image': np.array([v.image_index for _, v in vehicles], dtype=np.int16),
+        'vehicle_speed': np.array([v.speed for _, v in vehicles], dtype=np.float64),
+        'light_status': np.array([light.status.value for light in lights], dtype=np.int8),
+        'light_start_time': np.array([[light.start_time[s] for s in TrafficStatus] for light in lights]),
+        'light_extension': np.array([[light.duration_extension[s] for s in TrafficStatus] for light in lights]),
+        'latest_green_light_extension': np.float64(simulator.traffic_ctrl.latest_green_light_extension),
+        'queue_window': queue_window,
+        'queue_window_len': queue_window_len,
+        'counter': np.int64(vehicle_ctrl.counter),
+        'spawn_rate': np.array([RATES.index(simulator.background_ctrl.get_spawn_rate(dl)) for dl in DoubleLane],
+                               dtype=np.int8),
+        'next_spawn_time': np.array([simulator.next_spawn_time[dl] for dl in DoubleLane]),
+        'start_time': np.float64(simulator.start_time),
+        'extension_notification_start_time': np.float64(simulator.extension_notification_start_time),
+        'green_light_remaining_time': np.float64(simulator.green_light_remaining_time),
+        'moving_averages': np.array([simulator.moving_averages[lane] for lane in Lane], dtype=np.float64),
+        'is_extended': np.bool_(simulator.is_extended),
+        'extended_green_start_time': np.float64(np.nan if simulator.extended_green_start_time is None
+                                                else simulator.extended_green_start_time),
+        'horizontal': np.float64(simulator.horizontal),
+        'vertical': np.float64(simulator.vertical),
+        'rng_version': np.int64(rng_version),
+        'rng_state': np.array(rng_state, dtype=np.uint32),
+        'rng_gauss': np.float64(np.nan if rng_gauss is None else rng_gauss)
+    }
+
+    continuous_ctrl = simulator.continuous_ctrl
+    if continuous_ctrl is not None and continuous_ctrl.green_start_time is not None:
+        arrays['continuous_green_start_time'] = np.float64(continuous_ctrl.green_start_time)
+
+    detectors = vehicle_ctrl.detectors
+    if detectors is not None:
+        arrays['detector_between'] = detectors.between.copy()
+
+    if simulator.arrivals is not None:
+        arrays['arrivals'] = simulator.arrivals.remaining()
+        arrays['arrivals_end'] = np.float64(simulator.arrivals.end)
+        arrays['arrivals_origin'] = np.float64(simulator.arrivals.origin)
+
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def restore_snapshot(simulator, data):
+    """Load a snapshot produced by take_snapshot into an existing simulator."""
+    arrays = np.load(io.BytesIO(data))
+    # Shift every stored timestamp onto the current clock
+    offset = clock.now() - float(arrays['time'])
+
+    vehicle_ctrl = simulator.vehicle_ctrl
+    traffic_lights = simulator.traffic_ctrl.traffic_lights
+    # Restored vehicles start their telemetry afresh
+    vehicle_ctrl.clear_vehicles()
+    speeds = arrays['vehicle_speed'] if 'vehicle_speed' in arrays else np.zeros(len(arrays['vehicle_lane']))
+    for lane_value, x, y, image_index, speed in zip(arrays['vehicle_lane'], arrays['vehicle_x'],
+                                                    arrays['vehicle_y'], arrays['vehicle_image'], speeds):
+        lane = Lane(int(lane_value))
+        image_index = int(image_index)
+        vehicle = Vehicle(
+            float(x), float(y), lane, vehicle_ctrl._vehicle_image(lane, image_index),
+            vehicle_ctrl.surface, traffic_lights[lane], image_index=image_index
+        )
+        vehicle.speed = float(speed)
+        vehicle_ctrl.add_vehicle(vehicle)
+
+    for lane in Lane:
+        window = vehicle_ctrl.num_vehicles_behind_traffic[lane]
+        window.clear()
+        length = int(arrays['queue_window_len'][lane.value - 1])
+        window.extend(int(c) for c in arrays['queue_window'][lane.value - 1, :length])
+        vehicle_ctrl.num_vehicles_behind_traffic_sum[lane] = sum(window)
+    vehicle_ctrl.counter = int(arrays['counter'])
+    if vehicle_ctrl.detectors is not None and 'detector_between' in arrays:
+        vehicle_ctrl.detectors.between[:] = arrays['detector_between']
+
+    for lane in Lane:
+        light = traffic_lights[lane]
+        light.status = TrafficStatus(int(arrays['light_status'][lane.value - 1]))
+        for i, status in enumerate(TrafficStatus):
+            light.start_time[status] = float(arrays['light_start_time'][lane.value - 1, i]) + offset
+            light.duration_extension[status] = float(arrays['light_extension'][lane.value - 1, i])
+    simulator.traffic_ctrl.latest_green_light_extension = float(arrays['latest_green_light_extension'])
+
+    for i, double_lane in enumerate(DoubleLane):
+        simulator.background_ctrl.set_spawn_rate(double_lane, RATES[int(arrays['spawn_rate'][i])])
+        simulator.next_spawn_time[double_lane] = float(arrays['next_spawn_time'][i]) + offset
+
+    simulator.start_time = float(arrays['start_time']) + offset
+    simulator.extension_notification_start_time = float(arrays['extension_notification_start_time']) + offset
+    simulator.green_light_remaining_time = float(arrays['green_light_remaining_time'])
+    simulator.moving_averages = {lane: float(arrays['moving_averages'][lane.value - 1]) for lane in Lane}
+    simulator.is_extended = bool(arrays['is_extended'])
+    extended_green_start_time = float(arrays['extended_green_start_time'])
+    simulator.extended_green_start_time = None if np.isnan(extended_green_start_time) \
+        else extended_green_start_time + offset
+    simulator.horizontal = float(arrays['horizontal'])
+    simulator.vertical = float(arrays['vertical'])
+
+    if simulator.decision_pipeline is not None:
+        simulator.decision_pipeline.cancel()  # taken from the state being replaced
+
+    if simulator.continuous_ctrl is not None and 'continuous_green_start_time' in arrays:
+        simulator.continuous_ctrl.green_start_time = float(arrays['continuous_green_start_time']) + offset
+
+    if simulator.arrivals is not None and 'arrivals' in arrays:
+        schedule = arrays['arrivals'].copy()
+        schedule['time'] += offset
+        simulator.arrivals.restore(schedule, float(arrays['arrivals_end']) + offset,
+                                   float(arrays['arrivals_origin']) + offset)
+
+    rng_gauss = float(arrays['rng_gauss'])
+    random.setstate((
+        int(arrays['rng_version']),
+        tuple(int(v) for v in arrays['rng_state']),
+        None if np.isnan(rng_gauss) else rng_gauss
+    ))
+
+
+def snapshot_time(data):
+    """Clock reading at which a snapshot was taken."""
+    return float(np.load(io.BytesIO(data))['time'])
+
+
+def save_snapshot(simulator, path):
+    with open(path, 'wb') as f:
+        f.write(take_snapshot(simulator))
+
+
+def load_snapshot(simulator, path):
+    with open(path, 'rb') as f:
+        restore_snapshot(simulator, f.read())
+
+
+def _apply_overrides(config, overrides):
+    for key, value in overrides.items():
+        if isinstance(value, dict):
+            _apply_overrides(config[key], value)
+        else:
+            config[key] = value
+
+
+def run_branch(data, overrides, num_ticks, config=None):
+    """
+    Restore a snapshot in a fresh headless simulator with Config overrides,
+    run it in simulated time and summarize the outcome.
+    :param data: Snapshot bytes from take_snapshot
+    :param overrides: Nested dict merged into Config, e.g. {'simulator': {'control_mode': 'continuous'}}
+    :param num_ticks: Number of frames to simulate
+    :param config: Config of the snapshotted run, installed before the overrides; the current one by default
+    """
+    from src.Simulator import Simulator
+
+    # Branches may share a pool worker process, so each one leaves Config as it found it
+    saved = copy.deepcopy(Config)
+    try:
+        if config is not None:
+            Config.clear()
+            Config.update(copy.deepcopy(config))
+        _apply_overrides(Config, overrides)
+        # Resuming at the snapshot's own time keeps timestamps bit-identical
+        clock.use_simulated(snapshot_time(data))
+        simulator = Simulator('branch', headless=True)
+        restore_snapshot(simulator, data)
+
+        vehicle_ctrl = simulator.vehicle_ctrl
+        spawned_start = vehicle_ctrl.counter
+        present_start = sum(len(vehicle_ctrl.get_vehicles(lane)) for lane in Lane)
+        queue_total = {lane: 0 for lane in Lane}
+
+        for _ in range(num_ticks):
+            simulator.step()
+            for lane in Lane:
+                queue_total[lane] += vehicle_ctrl.get_queue_length(lane)
+
+        spawned = vehicle_ctrl.counter - spawned_start
+        present = sum(len(vehicle_ctrl.get_vehicles(lane)) for lane in Lane)
+        result = {
+            'overrides': overrides,
+            'vehicles_spawned': spawned,
+            'vehicles_served': spawned - (present - present_start),
+            'mean_queue': {lane.name: queue_total[lane] / max(num_ticks, 1) for lane in Lane}
+        }
+        if vehicle_ctrl.telemetry is not None:
+            result['delay'] = {lane.name: stats for lane, stats in vehicle_ctrl.telemetry.summary().items()}
+        if simulator.traffic_ctrl.fuzzy.instrumentation is not None:
+            result['fuzzy'] = simulator.traffic_ctrl.fuzzy.instrumentation.summary()
+        if simulator.decision_pipeline is not None:
+            result['decisions'] = simulator.decision_pipeline.summary()
+            simulator.decision_pipeline.close()
+        return result
+    finally:
+        Config.clear()
+        Config.update(saved)
+
+
+def fork_runs(data, overrides_list, num_ticks, processes=None):
+    """
+    Run one branch per Config override set from the same snapshot, in parallel.
+    Spawned workers start from the module defaults, so each one is handed this
+    process's Config to branch from, as run_branch would in process.
+    :return: List of branch summaries, in the order of overrides_list
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes, maxtasksperchild=1) as pool:
+        return pool.starmap(run_branch, [(data, overrides, num_ticks, Config) for overrides in overrides_list])
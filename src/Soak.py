@@ -0,0 +1,228 @@
+import argparse
+import fnmatch
+import gc
+import genericpath
+import os
+import re
+import sys
+import tracemalloc
+
+from src.Common import Lane
+from src.Clock import clock
+from src.Config import Config
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Frames of the soak test itself and of the modules it and tracemalloc use to filter,
+# compare and attribute snapshots, which would otherwise show up among the allocation sites
+_OWN_FRAMES = [
+    tracemalloc.__file__, __file__, fnmatch.__file__, genericpath.__file__, os.path.__file__,
+    '<frozen *path>',  # the same path modules when frozen into the interpreter
+    os.path.join(os.path.dirname(re.__file__), '*') if re.__file__.endswith('__init__.py') else re.__file__
+]
+
+
+def _rss_bytes():
+    """Current resident set size; the peak where /proc is unavailable; None where neither is, e.g. Windows."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def subsystem(filename):
+    """Subsystem an allocation site belongs to: a module of src, else the top-level package, else 'other'."""
+    path = os.path.abspath(filename)
+    if path.startswith(SRC_DIR + os.sep):
+        return os.path.splitext(os.path.relpath(path, SRC_DIR))[0].replace(os.sep, '.')
+    parts = path.split(os.sep)
+    if 'site-packages' in parts:
+        i = parts.index('site-packages')
+        if i + 1 < len(parts):
+            return os.path.splitext(parts[i + 1])[0]
+    return 'other'
+
+
+def _subsystem_totals(snapshot):
+    totals = {}
+    for stat in snapshot.statistics('filename'):
+        name = subsystem(stat.traceback[0].filename)
+        totals[name] = totals.get(name, 0) + stat.size
+    return totals
+
+
+def _live_vehicles():
+    from src.Entity.Vehicle import Vehicle
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Vehicle))
+
+
+class SoakTest:
+    """
+    Runs the simulator for a long simulated duration and watches its memory.
+
+    After a warmup, a baseline is taken; then every sample_interval simulated
+    seconds the run records traced Python memory (tracemalloc), RSS, live
+    Vehicle objects against those still on the road, and GC counters. At the
+    end, growth since the baseline is broken down per subsystem (module of
+    src, or third-party package) with the top allocation sites, and the run
+    fails if RSS or traced memory grew by more than the budget. Where RSS
+    cannot be read (no /proc and no resource module) only traced memory counts.
+    """
+
+    def __init__(self, headless=True, cfg=None):
+        """
+        :param headless: Step the model only; otherwise draw every frame as the window would
+        :param cfg: Config['soak'] by default
+        """
+        self.cfg = Config['soak'] if cfg is None else cfg
+        self.headless = headless
+        self.samples = []
+        self.baseline = None
+        self.latest = None
+        self.simulator = None
+
+    def _step(self, seconds):
+        import pygame
+        for _ in range(int(seconds * Config['simulator']['frame_rate'])):
+            if not self.headless:
+                pygame.event.pump()
+            self.simulator.step()
+            if not self.headless:
+                self.simulator.draw_ui()
+                pygame.display.update()
+
+    def _sample(self):
+        gc.collect()
+        vehicle_ctrl = self.simulator.vehicle_ctrl
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, pattern) for pattern in _OWN_FRAMES
+        ])
+        self.latest = snapshot
+        sample = {
+            'time': clock.now(),
+            'rss': _rss_bytes(),
+            'traced': tracemalloc.get_traced_memory()[0],
+            'subsystems': _subsystem_totals(snapshot),
+            'vehicles_live': _live_vehicles(),
+            'vehicles_on_road': sum(len(vehicle_ctrl.get_vehicles(lane)) for lane in Lane),
+            'gc_objects': len(gc.get_objects()),
+            'gc_counts': gc.get_count(),
+            'gc_collections': [stats['collections'] for stats in gc.get_stats()],
+            'gc_uncollectable': sum(stats['uncollectable'] for stats in gc.get_stats())
+        }
+        self.samples.append(sample)
+        return sample
+
+    def run(self, duration=None, progress=None):
+        """
+        Soak for `duration` simulated seconds (Config by default) after the warmup.
+        :param progress: Called with every sample as it is taken, e.g. to print it
+        :return: Report dict, see report()
+        """
+        from src.Simulator import Simulator
+
+        duration = self.cfg['duration'] if duration is None else duration
+        clock.use_simulated()
+        if not self.headless:
+            import pygame
+            pygame.init()
+        self.simulator = Simulator('Soak test', headless=self.headless)
+        self.simulator.initialize()
+
+        tracemalloc.start(self.cfg['traceback_frames'])
+        try:
+            self._step(self.cfg['warmup'])
+            self._sample()
+            self.baseline = self.latest
+            elapsed = 0
+            while elapsed < duration:
+                interval = min(self.cfg['sample_interval'], duration - elapsed)
+                self._step(interval)
+                elapsed += interval
+                sample = self._sample()
+                if progress is not None:
+                    progress(sample)
+        finally:
+            tracemalloc.stop()
+        return self.report()
+
+    def report(self):
+        """Growth since the baseline sample, per subsystem and allocation site, against the budget."""
+        first, last = self.samples[0], self.samples[-1]
+        budget = self.cfg['memory_budget_mb'] * 2 ** 20
+        rss_growth = None if first['rss'] is None else last['rss'] - first['rss']
+        traced_growth = last['traced'] - first['traced']
+
+        names = set(first['subsystems']) | set(last['subsystems'])
+        subsystems = {name: last['subsystems'].get(name, 0) - first['subsystems'].get(name, 0) for name in names}
+        sites = []
+        for stat in self.latest.compare_to(self.baseline, 'lineno')[:self.cfg['top_allocations']]:
+            frame = stat.traceback[0]
+            sites.append({
+                'site': f'{frame.filename}:{frame.lineno}',
+                'subsystem': subsystem(frame.filename),
+                'size_diff': stat.size_diff,
+                'count_diff': stat.count_diff
+            })
+
+        return {
+            'passed': (rss_growth is None or rss_growth <= budget) and traced_growth <= budget,
+            'budget': budget,
+            'simulated_seconds': last['time'] - first['time'],
+            'rss_growth': rss_growth,
+            'traced_growth': traced_growth,
+            'subsystems': dict(sorted(subsystems.items(), key=lambda item: -item[1])),
+            'top_allocations': sites,
+            # Vehicle objects still alive after leaving the road
+            'leaked_vehicles': last['vehicles_live'] - last['vehicles_on_road'],
+            'gc_objects_growth': last['gc_objects'] - first['gc_objects'],
+            'gc_uncollectable': last['gc_uncollectable'],
+            'samples': self.samples
+        }
+
+
+def print_report(report):
+    mb = 2 ** 20
+    rss = 'n/a' if report['rss_growth'] is None else f"{report['rss_growth'] / mb:+.2f} MB"
+    print(f"Soaked {report['simulated_seconds'] / 3600:.1f} simulated hours: "
+          f"RSS {rss}, traced {report['traced_growth'] / mb:+.2f} MB "
+          f"(budget {report['budget'] / mb:.0f} MB) -> {'PASS' if report['passed'] else 'FAIL'}")
+    print(f"Leaked vehicles {report['leaked_vehicles']}, GC objects {report['gc_objects_growth']:+d}, "
+          f"uncollectable {report['gc_uncollectable']}")
+    print('Growth per subsystem:')
+    for name, growth in report['subsystems'].items():
+        if growth:
+            print(f'  {name:<36}{growth / 1024:>+10.1f} KB')
+    print('Top allocation sites:')
+    for site in report['top_allocations']:
+        print(f"  {site['site']:<60}{site['size_diff'] / 1024:>+10.1f} KB {site['count_diff']:>+8d} blocks")
+
+
+def _print_sample(sample):
+    rss = '     n/a' if sample['rss'] is None else f"{sample['rss'] / 2 ** 20:8.1f}"
+    print(f"{sample['time']:>10.0f} s  RSS {rss} MB  traced {sample['traced'] / 2 ** 20:7.2f} MB  "
+          f"vehicles {sample['vehicles_live']}/{sample['vehicles_on_road']}  gc objects {sample['gc_objects']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the simulator for a long simulated time and watch its memory')
+    parser.add_argument('--duration', type=float, default=None, help='simulated seconds (default from Config)')
+    parser.add_argument('--interval', type=float, default=None, help='simulated seconds between samples')
+    parser.add_argument('--budget', type=float, default=None, help='allowed memory growth in MB')
+    parser.add_argument('--gui', action='store_true', help='draw every frame in a window')
+    args = parser.parse_args()
+
+    if args.interval is not None:
+        Config['soak']['sample_interval'] = args.interval
+    if args.budget is not None:
+        Config['soak']['memory_budget_mb'] = args.budget
+    result = SoakTest(headless=not args.gui).run(args.duration, progress=_print_sample)
+    print_report(result)
+    sys.exit(0 if result['passed'] else 1)
@@ -0,0 +1,162 @@
+import glob
+import json
+import os
+import pygame
+
+from src.Common import Lane, TrafficStatus
+from src.Config import Config
+
+ATLAS_IMAGE = os.path.join('images', 'atlas.png')
+ATLAS_INDEX = os.path.join('images', 'atlas.json')
+ATLAS_WIDTH = 1024
+
+LIGHT_ROTATION = {
+    Lane.left_to_right: 0,
+    Lane.bottom_to_top: 90,
+    Lane.right_to_left: 180,
+    Lane.top_to_bottom: 270
+}
+
+BACKGROUND_IMAGES = ['b1.jpg', 'b3.jpg', 'b4.jpg', 'road1.png', 'road3.png', 'pool.png']
+
+
+def vehicle_image_paths(lane: Lane):
+    """Source images for a lane, sorted so indices agree between processes."""
+    return sorted(glob.glob(os.path.join('images', f'vehicles_{lane.name}', '*.png')))
+
+
+def vehicle_size(lane: Lane):
+    """On-screen (width, height) of a vehicle travelling along the lane."""
+    if lane in [Lane.left_to_right, Lane.right_to_left]:
+        return Config['vehicle']['body_length'], Config['vehicle']['body_width']
+    return Config['vehicle']['body_width'], Config['vehicle']['body_length']
+
+
+def vehicle_key(lane: Lane, image_index):
+    return f'vehicle/{lane.name}/{image_index}'
+
+
+def traffic_light_key(lane: Lane, status: TrafficStatus):
+    return f'traffic_light/{lane.name}/{status.name}'
+
+
+def background_key(name):
+    return f'background/{name}'
+
+
+def sprite_specs():
+    """Every sprite the renderer draws: key -> (source path, (width, height), rotation)."""
+    specs = {}
+
+    for lane in Lane:
+        for i, path in enumerate(vehicle_image_paths(lane)):
+            specs[vehicle_key(lane, i)] = (path, vehicle_size(lane), 0)
+
+    light_size = (Config['traffic_light']['body_width'], Config['traffic_light']['body_height'])
+    for lane, rotation in LIGHT_ROTATION.items():
+        for status in TrafficStatus:
+            path = os.path.join('images', 'traffic_light', f'traffic_light_{status.name}.png')
+            specs[traffic_light_key(lane, status)] = (path, light_size, rotation)
+
+    yb_top, yb_left, yb_bottom, yb_right = Config['background']['yellow_box_junction']
+    tile_size = (yb_left + yb_right, yb_top + yb_bottom)
+    specs[background_key('yellow_box_junction.png')] = (
+        os.path.join('images', 'junction', 'yellow_box_junction.png'), tile_size, 0
+    )
+    for name in BACKGROUND_IMAGES:
+        specs[background_key(name)] = (os.path.join('images', 'buildings', name), tile_size, 0)
+
+    return specs
+
+
+def render_sprite(path, size, rotation):
+    """Load, scale and rotate a single source image."""
+    image = pygame.transform.scale(pygame.image.load(path), size)
+    return pygame.transform.rotate(image, rotation) if rotation else image
+
+
+def build_atlas():
+    """
+    Offline step: pack every sprite, already scaled and rotated, into one
+    image plus a JSON index of key -> [x, y, width, height].
+    """
+    sprites = {key: render_sprite(*spec) for key, spec in sprite_specs().items()}
+
+    # Shelf packing, tallest sprites first
+    index = {}
+    x = y = shelf_height = 0
+    for key in sorted(sprites, key=lambda k: -sprites[k].get_height()):
+        w, h = sprites[key].get_size()
+        if x + w > ATLAS_WIDTH:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        index[key] = [x, y, w, h]
+        x += w
+        shelf_height = max(shelf_height, h)
+
+    atlas = pygame.Surface((ATLAS_WIDTH, y + shelf_height), pygame.SRCALPHA)
+    for key, (x, y, w, h) in index.items():
+        atlas.blit(sprites[key], (x, y))
+
+    pygame.image.save(atlas, ATLAS_IMAGE)
+    with open(ATLAS_INDEX, 'w') as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return index
+
+
+class SpriteStore:
+    """
+    Lazily loaded sprites. Uses the packed atlas when it has been built and
+    falls back to the individual source images otherwise; nothing is decoded
+    until the first sprite is requested by a renderer.
+    """
+
+    def __init__(self):
+        self.specs = None
+        self.atlas = None
+        self.index = None
+        self.sprites = {}
+
+    def _load(self):
+        self.specs = sprite_specs()
+        self.index = {}
+        if os.path.exists(ATLAS_IMAGE) and os.path.exists(ATLAS_INDEX):
+            with open(ATLAS_INDEX) as f:
+                self.index = json.load(f)
+            self.atlas = pygame.image.load(ATLAS_IMAGE)
+
+    def get(self, key):
+        """Return the sprite for a key, ready to blit."""
+        if key not in self.sprites:
+            if self.specs is None:
+                self._load()
+            path, size, rotation = self.specs[key]
+            rect = self.index.get(key)
+            # A stale atlas built with different Config sizes is ignored per sprite
+            expected = size if rotation % 180 == 0 else size[::-1]
+            if rect and tuple(rect[2:]) == tuple(expected):
+                self.sprites[key] = self.atlas.subsurface(pygame.Rect(rect))
+            else:
+                self.sprites[key] = render_sprite(path, size, rotation)
+        return self.sprites[key]
+
+
+sprites = SpriteStore()
+
+# Fonts by (name, size, bold, underline); creating one per frame leaks in long runs
+_fonts = {}
+
+
+def get_font(name, size, bold=False, underline=False):
+    """System font, created on first use and shared afterwards."""
+    key = (name, size, bold, underline)
+    if key not in _fonts:
+        font = pygame.font.SysFont(name, size, bold)
+        font.set_underline(underline)
+        _fonts[key] = font
+    return _fonts[key]
+
+
+if __name__ == '__main__':
+    packed = build_atlas()
+    print(f'Packed {len(packed)} sprites into {ATLAS_IMAGE}')
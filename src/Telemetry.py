@@ -0,0 +1,121 @@
+import numpy as np
+
+from src.Common import Lane
+from src.Config import Config
+
+
+class VehicleTelemetry:
+    """
+    Per-vehicle lifecycle tracking in preallocated columns.
+
+    Every live vehicle owns a slot in the column arrays; each tick the moved /
+    stopped state of all vehicles is folded in with a few array operations. When a
+    vehicle leaves, its delay (time spent stopped), number of stops and travel
+    time go into per-lane running sums and a fixed-bin delay histogram, from
+    which the mean and 95th percentile are read, and its slot is reused.
+    """
+
+    def __init__(self):
+        cfg = Config['telemetry']
+        self.frame_rate = Config['simulator']['frame_rate']
+        self.stopped_speed = Config['vehicle']['idm']['stopped_speed']
+        capacity = cfg['initial_capacity']
+
+        self.spawn_tick = np.zeros(capacity, dtype=np.int64)
+        self.stopped_ticks = np.zeros(capacity, dtype=np.int32)
+        self.stops = np.zeros(capacity, dtype=np.int16)
+        self.moving = np.zeros(capacity, dtype=np.bool_)
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self.tick_count = 0
+
+        self.bin_seconds = cfg['delay_histogram_max'] / cfg['delay_histogram_bins']
+        # Last bin collects every delay beyond the histogram range
+        self.delay_histogram = np.zeros((len(Lane), cfg['delay_histogram_bins'] + 1), dtype=np.int64)
+        self.completed = np.zeros(len(Lane), dtype=np.int64)
+        self.delay_sum = np.zeros(len(Lane))
+        self.stops_sum = np.zeros(len(Lane), dtype=np.int64)
+        self.travel_time_sum = np.zeros(len(Lane))
+
+    def _grow(self):
+        capacity = len(self.spawn_tick)
+        for name in ['spawn_tick', 'stopped_ticks', 'stops', 'moving']:
+            column = getattr(self, name)
+            setattr(self, name, np.concatenate([column, np.zeros_like(column)]))
+        self.free_slots.extend(range(2 * capacity - 1, capacity - 1, -1))
+
+    def start(self):
+        """Allocate a slot for a vehicle entering the world."""
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+        self.spawn_tick[slot] = self.tick_count
+        self.stopped_ticks[slot] = 0
+        self.stops[slot] = 0
+        self.moving[slot] = True
+        return slot
+
+    def update(self, slots, previous_keys, keys, speeds=None):
+        """
+        Fold one tick into the columns.
+        :param slots: Slots of every vehicle on the road
+        :param previous_keys: Their LaneIndex keys before moving, in the same order
+        :param keys: Their LaneIndex keys after moving
+        :param speeds: Their speeds after moving, under car-following kinematics. A vehicle
+        is then stopped below Config['vehicle']['idm']['stopped_speed'] rather than when it
+        did not move at all, since vehicles queued behind a light keep creeping forward
+        """
+        self.tick_count += 1
+        if not slots:
+            return
+        slots = np.array(slots)
+        if speeds is not None:
+            stopped = np.asarray(speeds) < self.stopped_speed
+        else:
+            stopped = np.asarray(previous_keys) == np.asarray(keys)
+        self.stopped_ticks[slots] += stopped
+        self.stops[slots] += self.moving[slots] & stopped
+        self.moving[slots] = ~stopped
+
+    def finish(self, lane: Lane, slots):
+        """Record the vehicles in `slots` as having left the lane and free their slots."""
+        if not slots:
+            return
+        slots = np.asarray(slots)
+        delay = self.stopped_ticks[slots] / self.frame_rate
+        bins = np.minimum((delay / self.bin_seconds).astype(np.int64), self.delay_histogram.shape[1] - 1)
+
+        i = lane.value - 1
+        np.add.at(self.delay_histogram[i], bins, 1)
+        self.completed[i] += len(slots)
+        self.delay_sum[i] += delay.sum()
+        self.stops_sum[i] += self.stops[slots].sum()
+        self.travel_time_sum[i] += (self.tick_count - self.spawn_tick[slots]).sum() / self.frame_rate
+        self.free_slots.extend(slots.tolist())
+
+    def discard(self, slots):
+        """Free slots of vehicles removed without leaving the world, e.g. on snapshot restore."""
+        self.free_slots.extend(int(slot) for slot in slots)
+
+    def percentile_delay(self, lane: Lane, q):
+        """Upper edge of the histogram bin holding the q-th percentile delay."""
+        histogram = self.delay_histogram[lane.value - 1]
+        total = histogram.sum()
+        if total == 0:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(histogram), q / 100 * total))
+        return (i + 1) * self.bin_seconds
+
+    def summary(self):
+        """Per-lane aggregates over the vehicles that have left so far."""
+        result = {}
+        for lane in Lane:
+            i = lane.value - 1
+            n = max(int(self.completed[i]), 1)
+            result[lane] = {
+                'vehicles': int(self.completed[i]),
+                'mean_delay': float(self.delay_sum[i]) / n,
+                'p95_delay': self.percentile_delay(lane, 95),
+                'mean_stops': float(self.stops_sum[i]) / n,
+                'mean_travel_time': float(self.travel_time_sum[i]) / n
+            }
+        return result
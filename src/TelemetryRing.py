@@ -0,0 +1,171 @@
+import argparse
+import time
+import numpy as np
+
+from src.Common import Lane
+from src.Clock import clock
+from src.Config import Config
+
+MAGIC = b'FTCRING1'
+
+# One record per published tick, in a fixed layout readable from any process
+RECORD_DTYPE = np.dtype([
+    ('seq', np.int64),                      # 1-based record number, 0 while being written
+    ('time', np.float64),                   # simulation clock reading
+    ('counter', np.int64),                  # vehicles spawned so far
+    ('moving_averages', np.float32, (len(Lane),)),
+    ('queue_lengths', np.int32, (len(Lane),)),
+    ('light_status', np.int8, (len(Lane),)),
+    ('active_lane', np.int8),               # DoubleLane value, 0 during a transition
+    ('green_light_extension', np.float32)
+])
+
+# seq: number of records published; the newest record sits at (seq - 1) % capacity
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('record_size', np.int64),
+    ('capacity', np.int64),
+    ('seq', np.int64)
+])
+
+
+def _map(path, mode, capacity=None):
+    """Memory-map the header and record array of a ring file."""
+    header = np.memmap(path, dtype=HEADER_DTYPE, mode=mode, shape=())
+    if capacity is None:
+        if header['magic'] != MAGIC or header['record_size'] != RECORD_DTYPE.itemsize:
+            raise ValueError(f'{path} is not a telemetry ring of this version')
+        capacity = int(header['capacity'])
+    records = np.memmap(path, dtype=RECORD_DTYPE, mode=mode, offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+    return header, records
+
+
+class TelemetryRing:
+    """
+    Writer side of a telemetry ring buffer file.
+
+    Each record is blanked (seq 0) before it is overwritten and stamped with
+    its record number afterwards, and the header seq is bumped last, so readers
+    never take a lock: they read the header, then check that the records they
+    used still carry the numbers they expected.
+    """
+
+    def __init__(self, path, capacity=None):
+        capacity = Config['dashboard']['capacity'] if capacity is None else capacity
+        with open(path, 'wb') as f:
+            f.truncate(HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize)
+
+        self.path = path
+        self.header, self.records = _map(path, 'r+', capacity)
+        self.capacity = capacity
+        self.scratch = np.zeros((), dtype=RECORD_DTYPE)
+
+        self.header['capacity'] = capacity
+        self.header['record_size'] = RECORD_DTYPE.itemsize
+        self.header['seq'] = 0
+        self.header['magic'] = MAGIC
+
+    def publish(self, simulator):
+        """Append one record built from the simulator's controllers."""
+        seq = int(self.header['seq']) + 1
+        record = self.scratch
+        vehicle_ctrl = simulator.vehicle_ctrl
+        traffic_ctrl = simulator.traffic_ctrl
+
+        moving_averages = vehicle_ctrl.get_moving_averages_num_vehicles_behind_traffic()
+        for lane in Lane:
+            record['moving_averages'][lane.value - 1] = moving_averages[lane]
+            record['queue_lengths'][lane.value - 1] = vehicle_ctrl.get_queue_length(lane)
+            record['light_status'][lane.value - 1] = traffic_ctrl.traffic_lights[lane].status.value
+        active_lane = traffic_ctrl.get_current_active_lane()
+        record['active_lane'] = 0 if active_lane is None else active_lane.value
+        record['green_light_extension'] = traffic_ctrl.get_green_light_extension()
+        record['time'] = clock.now()
+        record['counter'] = vehicle_ctrl.counter
+        record['seq'] = 0
+
+        slot = self.records[(seq - 1) % self.capacity]
+        slot['seq'] = 0
+        self.records[(seq - 1) % self.capacity] = record
+        slot['seq'] = seq
+        self.header['seq'] = seq
+
+    def close(self):
+        self.records.flush()
+        del self.header, self.records
+
+
+class TelemetryReader:
+    """
+    Tails a telemetry ring written by another process.
+    Records are returned as views into the mapped file; call valid() after
+    using them to drop any that the writer overwrote in the meantime.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.header, self.records = _map(path, 'r')
+        self.capacity = len(self.records)
+
+    @property
+    def seq(self):
+        """Number of records published so far."""
+        return int(self.header['seq'])
+
+    def latest(self):
+        """Private copy of the newest complete record, or None if nothing was published."""
+        while True:
+            seq = self.seq
+            if seq == 0:
+                return None
+            record = self.records[(seq - 1) % self.capacity].copy()
+            if record['seq'] == seq:
+                return record
+
+    def tail(self, since):
+        """
+        Records published after record number `since`, as a zero-copy view.
+        Only the newest `capacity` records are kept, and a view never wraps
+        around the end of the file, so call again until it comes back empty.
+        :return: (records, seq of the last record returned)
+        """
+        seq = self.seq
+        first = max(since + 1, seq - self.capacity + 1)
+        if first > seq:
+            return self.records[:0], since
+        start = (first - 1) % self.capacity
+        count = min(seq - first + 1, self.capacity - start)
+        return self.records[start:start + count], first + count - 1
+
+    @staticmethod
+    def valid(records, last_seq):
+        """Mask of the records from tail() that were not overwritten while being read."""
+        return records['seq'] == np.arange(last_seq - len(records) + 1, last_seq + 1)
+
+    def close(self):
+        del self.header, self.records
+
+
+def tail_file(path, interval=0.5):
+    """Print queue lengths and light decisions from a ring file as they arrive."""
+    reader = TelemetryReader(path)
+    seq = reader.seq
+    try:
+        while True:
+            records, last = reader.tail(seq)
+            for record in records[TelemetryReader.valid(records, last)]:
+                print(f"{record['time']:10.1f}  queues {record['queue_lengths'].tolist()}  "
+                      f"active {int(record['active_lane'])}  extension {record['green_light_extension']:.2f}")
+            if last == seq:
+                time.sleep(interval)
+            seq = last
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Tail a telemetry ring file')
+    parser.add_argument('path', help='ring file written by the simulator')
+    tail_file(parser.parse_args().path)
@@ -0,0 +1,31 @@
+import copy
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from src.Clock import clock
+from src.Config import Config
+
+
+@pytest.fixture(autouse=True)
+def config():
+    """Config for the test to change, restored afterwards along with the clock."""
+    saved = copy.deepcopy(Config)
+    simulated, time = clock.simulated, clock.time
+    clock.use_simulated()
+    yield Config
+    Config.clear()
+    Config.update(saved)
+    clock.simulated, clock.time = simulated, time
+
+
+def run_simulator(ticks, caption='test'):
+    """A headless simulator stepped `ticks` frames in simulated time."""
+    from src.Simulator import Simulator
+    simulator = Simulator(caption, headless=True)
+    simulator.initialize()
+    for _ in range(ticks):
+        simulator.step()
+    return simulator
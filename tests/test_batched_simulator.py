@@ -0,0 +1,49 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.BatchedSimulator import BatchedSimulator
+from src.Clock import clock
+from src.Common import Lane, DoubleLane, TrafficStatus
+from src.Simulator import Simulator
+
+COMBOS = [('slow', 'fast'), ('medium', 'medium'), ('fast', 'slow')]
+
+
+@pytest.mark.parametrize('kinematics', ['constant', 'idm'])
+@pytest.mark.parametrize('control', ['phase_end', 'fixed'])
+def test_matches_simulator_tick_for_tick(config, kinematics, control):
+    config['vehicle']['kinematics'] = kinematics
+    config['simulator']['control_mode'] = control
+    batch = BatchedSimulator(len(COMBOS), COMBOS)
+    batch.initialize()
+    simulators = []
+    for horizontal, vertical in COMBOS:
+        clock.use_simulated()
+        random.seed(0)
+        simulator = Simulator('test', headless=True)
+        simulator.background_ctrl.set_spawn_rate(DoubleLane.Horizontal, horizontal)
+        simulator.background_ctrl.set_spawn_rate(DoubleLane.Vertical, vertical)
+        simulator.initialize()
+        simulators.append(simulator)
+
+    extended = False
+    for tick in range(30 * 90):
+        for simulator in simulators:
+            clock.time = batch.time
+            simulator.step()
+        batch.step()
+        extended |= bool(batch.extension.any())
+        for k, simulator in enumerate(simulators):
+            vehicle_ctrl = simulator.vehicle_ctrl
+            lights = simulator.traffic_ctrl.traffic_lights
+            assert vehicle_ctrl.counter == batch.counter[k], tick
+            assert [lights[lane].status.value for lane in Lane] == batch.status[k].tolist(), tick
+            assert lights[Lane.left_to_right].duration_extension[TrafficStatus.green] == \
+                pytest.approx(batch.extension[k, 0], abs=1e-9), tick
+            for i, lane in enumerate(Lane):
+                progress = [vehicle.progress for vehicle in vehicle_ctrl.get_vehicles(lane)]
+                assert len(progress) == batch.count[k, i], tick
+                np.testing.assert_allclose(progress, batch.progress[k, i, :batch.count[k, i]], atol=1e-6)
+    assert extended == (control == 'phase_end')
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from src.DecisionPipeline import DecisionPipeline
+
+
+class SlowFuzzy:
+    """Fuzzy controller stand-in whose decisions block until released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def get_extension(self, arriving, behind, extension_count):
+        self.release.wait(5)
+        return 3.0
+
+
+def pipeline(fuzzy, wait):
+    return DecisionPipeline(fuzzy, {'executor': 'thread', 'lead_time': 0.0, 'wait': wait, 'latency_bins': 30})
+
+
+def test_result_within_the_wait_is_used(config):
+    fuzzy = SlowFuzzy()
+    fuzzy.release.set()
+    decisions = pipeline(fuzzy, wait=5)
+    decisions.submit('green', 1, 2, 0)
+    assert decisions.collect('green') == 3.0
+    summary = decisions.summary()
+    decisions.close()
+    assert summary['deadline_misses'] == 0
+    assert summary['max_latency'] > 0
+
+
+def test_miss_is_recorded_with_its_elapsed_time(config):
+    fuzzy = SlowFuzzy()
+    decisions = pipeline(fuzzy, wait=0.05)
+    decisions.submit('green', 1, 2, 0)
+    assert decisions.collect('green', fallback=0.0) == 0.0
+
+    # The late result arriving afterwards is not counted a second time
+    fuzzy.release.set()
+    time.sleep(0.1)
+    summary = decisions.summary()
+    decisions.close()
+    assert summary['deadline_misses'] == 1
+    assert decisions.measured == 1
+    assert 0.05 <= summary['max_latency'] < 1
+
+
+def test_unsubmitted_decision_misses(config):
+    decisions = pipeline(SlowFuzzy(), wait=0)
+    assert decisions.collect('green', fallback=1.5) == 1.5
+    decisions.close()
+    assert decisions.summary()['deadline_misses'] == 1
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.Demand import poisson_arrivals, platoon_arrivals, generate_arrivals, profile_multiplier
+
+RATES = np.array([1.0, 0.5, 0.25, 0.25])  # vehicles per second per lane
+WINDOW = 60
+
+
+def _counts(times, lanes, seconds):
+    return np.bincount(lanes, minlength=len(RATES)) / seconds, np.sort(times)
+
+
+def test_poisson_flow_matches_rates():
+    rng = np.random.default_rng(0)
+    times, lanes = poisson_arrivals(rng, RATES, 0, 100000)
+    flow, _ = _counts(times, lanes, 100000)
+    np.testing.assert_allclose(flow, RATES, rtol=0.02)
+    assert times.min() >= 0 and times.max() < 100000
+
+
+def test_platoon_flow_over_consecutive_draws_matches_rates():
+    # Short draws, so followers trailing past each boundary would show if dropped
+    rng = np.random.default_rng(0)
+    draws = [platoon_arrivals(rng, RATES, 4, 1.5, k * WINDOW, (k + 1) * WINDOW) for k in range(2000)]
+    times = np.concatenate([t for t, _ in draws])
+    lanes = np.concatenate([lane for _, lane in draws])
+    flow, _ = _counts(times, lanes, 2000 * WINDOW)
+    np.testing.assert_allclose(flow, RATES, rtol=0.03)
+    assert flow.sum() == pytest.approx(RATES.sum(), rel=0.01)
+
+
+def test_profile_thins_to_the_multiplier(config):
+    config['demand'].update(arrivals='poisson', profile=[(0, 1.0), (50, 0.0), (100, 1.0)],
+                            flow={'left_to_right': 3600, 'right_to_left': 1800,
+                                  'top_to_bottom': 900, 'bottom_to_top': 900})
+    schedule = generate_arrivals(np.random.default_rng(0), 0, 200000, 0)
+    assert np.all(np.diff(schedule['time']) >= 0)
+    # The multiplier averages 0.5 and is 0 halfway through each period
+    flow = np.bincount(schedule['lane'] - 1, minlength=4) / 200000
+    np.testing.assert_allclose(flow, RATES * 0.5, rtol=0.03)
+    phase = np.mod(schedule['time'], 100)
+    assert np.mean(np.abs(phase - 50) < 5) < 0.02
+
+
+def test_profile_repeats_with_the_last_breakpoint():
+    profile = [(0, 1.0), (50, 2.0), (100, 1.0)]
+    np.testing.assert_allclose(profile_multiplier(profile, np.array([0, 25, 50, 150, 175])),
+                               [1.0, 1.5, 2.0, 2.0, 1.5])
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.Common import Lane
+from src.Detectors import LoopDetectors
+from src.LaneGeometry import build_lane_geometry
+
+
+def _keys(geometry, lanes, gaps):
+    """LaneIndex keys of vehicles whose fronts are `gaps` pixels short of the stop line."""
+    keys = []
+    for lane, gap in zip(lanes, gaps):
+        g = geometry[lane]
+        front_stop = g.stop_progress + (g.vehicle_length if g.sign > 0 else 0)
+        front = front_stop - gap
+        keys.append(-(front - g.vehicle_length if g.sign > 0 else front))
+    return np.array(keys, dtype=np.float64)
+
+
+def test_zones_match_in_every_direction(config):
+    config['detectors'].update(distances=[0, 100], length=12, interval=1)
+    geometry = build_lane_geometry()
+    lanes = list(Lane)
+    lane_index = np.array([lane.value - 1 for lane in lanes], dtype=np.intp)
+    length = geometry[Lane.left_to_right].vehicle_length
+
+    # Front on the detector, past the zone's far end with the rear still on it, just clear of
+    # the zone downstream, and just short of the detector upstream
+    for gap, occupied in [(100, True), (100 - 12 - length + 1, True), (100 - 12 - length - 1, False),
+                          (101, False)]:
+        detectors = LoopDetectors(geometry)
+        keys = _keys(geometry, lanes, [gap] * len(lanes))
+        detectors.update(lane_index, keys, keys)
+        np.testing.assert_array_equal(detectors.occupied_ticks[:, 1], [occupied] * len(lanes), err_msg=str(gap))
+
+
+def test_counts_and_queue_estimate(config):
+    config['detectors'].update(distances=[0, 100], length=12, interval=1)
+    geometry = build_lane_geometry()
+    lanes = list(Lane)
+    lane_index = np.array([lane.value - 1 for lane in lanes], dtype=np.intp)
+    detectors = LoopDetectors(geometry)
+
+    # Every lane's vehicle moves over the 100 px detector, then waits between the two
+    before, after = _keys(geometry, lanes, [101] * 4), _keys(geometry, lanes, [99] * 4)
+    detectors.update(lane_index, before, after)
+    detectors.update(lane_index, after, after)
+    np.testing.assert_array_equal(detectors.counts, [[0, 1]] * 4)
+    assert detectors.queue_estimates() == {lane: 1.0 for lane in Lane}
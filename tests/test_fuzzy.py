@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.Common import DoubleLane
+from src.Fuzzy import Fuzzy
+from tests.conftest import run_simulator
+
+# Grid nodes of a 0.5 lookup table, and inputs past either end of the membership functions
+INPUTS = [(0, 0), (2, 5), (7.5, 3), (13.2, 2), (2, 13.2), (20, 20), (-1, 3)]
+
+
+@pytest.mark.parametrize('extension_count', [0, 1])
+def test_paths_agree_past_the_last_breakpoint(config, extension_count):
+    fuzzy = Fuzzy()
+    fuzzy.build_lookup_table(0.5)
+    arriving, behind = np.array(INPUTS, dtype=np.float64).T
+    batch = fuzzy.get_extension_batch(arriving, behind, extension_count)
+    for (a, b), batched in zip(INPUTS, batch):
+        exact = fuzzy.get_extension(a, b, extension_count)
+        assert batched == pytest.approx(exact)
+        # Every input is a grid node or saturates, so interpolation is exact
+        assert fuzzy.get_extension_interpolated(a, b, extension_count) == pytest.approx(exact)
+
+
+def test_inputs_saturate_at_the_top_term(config):
+    fuzzy = Fuzzy()
+    assert fuzzy.get_extension(13.2, 2, 0) == pytest.approx(fuzzy.get_extension(9, 2, 0))
+    assert fuzzy.get_extension(2, 40, 1) == pytest.approx(fuzzy.get_extension(2, 9, 1))
+
+
+def test_large_world_with_long_queues_runs(config):
+    config['world'].update(width=3000, height=3000)
+    from src.Simulator import Simulator
+    simulator = Simulator('test', headless=True)
+    simulator.initialize()
+    for double_lane in DoubleLane:
+        simulator.background_ctrl.set_spawn_rate(double_lane, 'fast')
+    for _ in range(1200):
+        simulator.step()
+    assert max(simulator.moving_averages.values()) > 12
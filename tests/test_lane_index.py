@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from src.LaneIndex import LaneIndex
+
+
+def _lane(seed, size=60):
+    rng = random.Random(seed)
+    # Front of the queue first, with ties as vehicles stand bumper to bumper at a hold line
+    progresses = sorted((rng.choice([rng.uniform(-50, 850), 400.0]) for _ in range(size)), reverse=True)
+    index = LaneIndex()
+    for progress in progresses:
+        index.append(progress)
+    return index, progresses
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_queries_match_a_linear_scan(seed):
+    index, progresses = _lane(seed)
+    rng = random.Random(seed + 100)
+    for stop in [400.0, -100.0, 900.0] + [rng.uniform(-100, 900) for _ in range(50)]:
+        behind = [i for i, p in enumerate(progresses) if p <= stop]
+        assert index.first_behind(stop) == (behind[0] if behind else len(progresses))
+        assert index.count_behind(stop) == len(behind)
+        past = [i for i, p in enumerate(progresses) if p > stop]
+        assert index.last_past(stop) == (past[-1] if past else None)
+
+        lo, hi = sorted([stop, rng.uniform(-100, 900)])
+        i, j = index.range(lo, hi)
+        assert list(range(i, j)) == [k for k, p in enumerate(progresses) if lo <= p <= hi]
+
+
+def test_update_and_rebuild_keep_the_order():
+    index, progresses = _lane(0)
+    moved = [p + 5 for p in progresses]
+    for i, progress in enumerate(moved):
+        index.update(i, progress)
+    assert index.keys == sorted(index.keys)
+    index.rebuild(moved[3:])
+    assert len(index) == len(moved) - 3
+    assert index.count_behind(400.0) == sum(p <= 400.0 for p in moved[3:])
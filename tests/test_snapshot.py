@@ -0,0 +1,35 @@
+import io
+
+import numpy as np
+
+from src.Snapshot import take_snapshot, restore_snapshot, run_branch, fork_runs
+from tests.conftest import run_simulator
+
+
+def test_round_trip_is_exact(config):
+    simulator = run_simulator(600)
+    data = take_snapshot(simulator)
+    restore_snapshot(simulator, data)
+    before, after = np.load(io.BytesIO(data)), np.load(io.BytesIO(take_snapshot(simulator)))
+    assert sorted(before.files) == sorted(after.files)
+    for name in before.files:
+        np.testing.assert_array_equal(after[name], before[name], err_msg=name)
+
+
+def test_forked_branch_continues_the_snapshotted_run(config):
+    config['vehicle']['kinematics'] = 'idm'
+    config['demand']['arrivals'] = 'poisson'
+    config['detectors']['enabled'] = True
+    data = take_snapshot(run_simulator(600))
+
+    in_process = run_branch(data, {}, 600)
+    forked, = fork_runs(data, [{}], 600, processes=1)
+    assert forked['vehicles_spawned'] == in_process['vehicles_spawned']
+    assert forked['vehicles_served'] == in_process['vehicles_served']
+    assert forked == in_process
+
+
+def test_run_branch_leaves_config_unchanged(config):
+    data = take_snapshot(run_simulator(60))
+    run_branch(data, {'simulator': {'control_mode': 'fixed'}}, 10)
+    assert config['simulator']['control_mode'] == 'phase_end'
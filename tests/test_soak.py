@@ -0,0 +1,27 @@
+import builtins
+import importlib
+import sys
+
+import src.Soak
+
+
+def test_imports_and_reports_without_resource(config, monkeypatch):
+    # As on Windows: neither /proc nor the POSIX-only resource module
+    real_open = builtins.open
+
+    def no_proc(path, *args, **kwargs):
+        if str(path).startswith('/proc'):
+            raise OSError(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    monkeypatch.setattr(builtins, 'open', no_proc)
+    soak = importlib.reload(src.Soak)
+    assert soak._rss_bytes() is None
+
+    config['soak'].update(warmup=5, sample_interval=5)
+    report = soak.SoakTest().run(duration=10)
+    assert report['rss_growth'] is None
+    assert report['passed'] == (report['traced_growth'] <= report['budget'])
+    assert not any(site['site'].startswith(soak.tracemalloc.__file__) for site in report['top_allocations'])
+    soak.print_report(report)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.TelemetryRing import TelemetryRing, TelemetryReader
+from tests.conftest import run_simulator
+
+
+def test_reader_sees_what_the_writer_published(config, tmp_path):
+    path = str(tmp_path / 'ring')
+    simulator = run_simulator(10)
+    ring = TelemetryRing(path, capacity=8)
+    reader = TelemetryReader(path)
+    assert reader.latest() is None
+
+    for _ in range(5):
+        simulator.step()
+        ring.publish(simulator)
+    records, last = reader.tail(0)
+    assert last == 5 and len(records) == 5
+    assert TelemetryReader.valid(records, last).all()
+    np.testing.assert_array_equal(records['seq'], np.arange(1, 6))
+    assert reader.latest()['counter'] == simulator.vehicle_ctrl.counter
+
+    # Only the newest `capacity` records are kept, and a view stops at the end of the file
+    for _ in range(10):
+        simulator.step()
+        ring.publish(simulator)
+    records, last = reader.tail(5)
+    assert (records['seq'][0], last) == (8, 8)
+    records, last = reader.tail(last)
+    assert (records['seq'][0], last) == (9, 15)
+    reader.close()
+    ring.close()
+
+
+def test_overwritten_records_are_invalid(config, tmp_path):
+    path = str(tmp_path / 'ring')
+    simulator = run_simulator(10)
+    ring = TelemetryRing(path, capacity=4)
+    reader = TelemetryReader(path)
+    for _ in range(4):
+        ring.publish(simulator)
+    records, last = reader.tail(0)
+
+    # The writer laps the reader while it still holds the view
+    ring.publish(simulator)
+    ring.publish(simulator)
+    assert TelemetryReader.valid(records, last).tolist() == [False, False, True, True]
+    reader.close()
+    ring.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not-a-ring'
+    path.write_bytes(b'\0' * 4096)
+    with pytest.raises(ValueError):
+        TelemetryReader(str(path))